@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Union
+from fastapi import HTTPException
+from app.config import get_settings
+
+
+@dataclass(frozen=True)
+class OperationPolicy:
+    priority: int  # Lower runs first
+    max_concurrency: int
+
+
+# Interactive edits jump the queue; bulk plan generation waits and is shed first.
+OPERATIONS: Dict[str, OperationPolicy] = {
+    "graph_edit": OperationPolicy(priority=0, max_concurrency=4),
+    "questions": OperationPolicy(priority=1, max_concurrency=4),
+    "graph": OperationPolicy(priority=1, max_concurrency=4),
+    "plan": OperationPolicy(priority=2, max_concurrency=2),
+}
+
+MIN_LIMIT = 1
+DECREASE_FACTOR = 0.5
+MAX_RETRY_AFTER = 60
+
+# Set by slot() for the code it admits; report_llm_failure() flips it.
+_degraded: ContextVar[Optional[list]] = ContextVar("admission_degraded", default=None)
+
+
+def report_llm_failure():
+    """Marks the current slot's LLM call as failed even though the request succeeds.
+
+    For graceful degradation (e.g. serving a locally built fallback after a
+    429), which would otherwise look like a fast success and raise the limit.
+    Does nothing outside a slot.
+    """
+    degraded = _degraded.get()
+    if degraded is not None:
+        degraded.append(True)
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit driven by observed latency and errors.
+
+    Each fast, successful call adds 1/limit (about +1 per limit's worth of
+    calls); a slow or failed call halves the limit. Decreases are spaced at
+    least `cooldown` seconds apart, so a burst of failures from calls that were
+    already in flight counts once instead of collapsing the limit to the floor.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, target_latency: float, cooldown: Optional[float] = None):
+        self.value = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.target_latency = target_latency
+        self.cooldown = target_latency if cooldown is None else cooldown
+        self._last_decrease = -math.inf
+
+    def on_result(self, latency: float, ok: bool):
+        if ok and latency <= self.target_latency:
+            self.value = min(self.maximum, self.value + 1.0 / self.value)
+            return
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.value = max(self.minimum, self.value * DECREASE_FACTOR)
+            self._last_decrease = now
+
+    @property
+    def current(self) -> int:
+        return int(self.value)
+
+
+class _Waiter:
+    __slots__ = ("operation", "future")
+
+    def __init__(self, operation: str, future: asyncio.Future):
+        self.operation = operation
+        self.future = future
+
+
+class AdmissionController:
+    """Bounds concurrent LLM-backed requests, queues by priority and sheds load.
+
+    A request runs when its operation is under its own cap and the shared
+    adaptive limit has room. Otherwise it waits in a priority queue, unless the
+    queue is already too deep for its priority; lower-priority work is shed
+    first. Shed requests get a 503 with a Retry-After estimated from the
+    current queue depth and average latency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_depth: int,
+        target_latency: float,
+        max_wait: float,
+        operations: Dict[str, OperationPolicy] = OPERATIONS,
+    ):
+        self.operations = operations
+        self.limit = AdaptiveLimit(initial=max_concurrency, minimum=MIN_LIMIT, maximum=max_concurrency, target_latency=target_latency)
+        self.max_queue_depth = max_queue_depth
+        self.max_wait = max_wait
+        self._active: Dict[str, int] = {name: 0 for name in operations}
+        self._active_total = 0
+        self._queues: Dict[int, Deque[_Waiter]] = {}
+        self._avg_latency = target_latency / 2
+        self.shed = 0
+
+    def _queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _has_room(self, operation: str) -> bool:
+        return (
+            self._active_total < self.limit.current
+            and self._active[operation] < self.operations[operation].max_concurrency
+        )
+
+    def _shed_threshold(self, priority: int) -> int:
+        # Priority 0 may fill the whole queue, each lower priority a quarter less
+        return max(1, int(self.max_queue_depth * (1 - 0.25 * priority)))
+
+    def _retry_after(self) -> int:
+        backlog = self._queue_depth() + self._active_total
+        estimate = backlog * self._avg_latency / max(1, self.limit.current)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _reject(self, operation: str):
+        self.shed += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy; {operation} request was not admitted. Please retry later.",
+            headers={"Retry-After": str(self._retry_after())},
+        )
+
+    def _grant(self, operation: str):
+        self._active[operation] += 1
+        self._active_total += 1
+
+    def _dispatch(self):
+        """Hands free capacity to waiters, highest priority first, skipping operations at their cap."""
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            for waiter in list(queue):
+                if self._active_total >= self.limit.current:
+                    return
+                if waiter.future.done():
+                    queue.remove(waiter)
+                elif self._has_room(waiter.operation):
+                    queue.remove(waiter)
+                    self._grant(waiter.operation)
+                    waiter.future.set_result(None)
+
+    async def acquire(self, operation: str):
+        policy = self.operations[operation]
+        if self._has_room(operation) and not any(
+            self._queues.get(p) for p in range(policy.priority + 1)
+        ):
+            self._grant(operation)
+            return
+        if self._queue_depth() >= self._shed_threshold(policy.priority):
+            self._reject(operation)
+
+        waiter = _Waiter(operation, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(policy.priority, deque()).append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self._release_slot(operation)
+            else:
+                waiter.future.cancel()
+                if waiter in self._queues[policy.priority]:
+                    self._queues[policy.priority].remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(operation)
+            raise
+
+    def _release_slot(self, operation: str):
+        self._active[operation] -= 1
+        self._active_total -= 1
+        self._dispatch()
+
+    def release(self, operation: str, latency: float, ok: Optional[bool]):
+        """Returns a slot and feeds the outcome into the adaptive limit (None: no signal about the LLM)."""
+        if ok is not None:
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency
+            self.limit.on_result(latency, ok)
+        self._release_slot(operation)
+
+    @asynccontextmanager
+    async def slot(self, operation: str):
+        """Admits one LLM-backed operation for the duration of the block (or raises 503)."""
+        await self.acquire(operation)
+        started = time.monotonic()
+        ok: Optional[bool] = False
+        degraded: list = []
+        token = _degraded.set(degraded)
+        try:
+            yield
+            ok = not degraded
+        except HTTPException as e:
+            # Client errors (e.g. 404) and our own backpressure (503 while another worker
+            # holds the lock) say nothing about LLM health
+            ok = None if e.status_code < 500 or e.status_code == 503 else False
+            raise
+        finally:
+            _degraded.reset(token)
+            self.release(operation, time.monotonic() - started, ok)
+
+    def stats(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+        return {
+            "limit": self.limit.current,
+            "active": self._active_total,
+            "active_by_operation": dict(self._active),
+            "queued": self._queue_depth(),
+            "shed": self.shed,
+            "avg_latency": round(self._avg_latency, 3),
+        }
+
+
+_controller: Union[AdmissionController, None] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Returns the process-wide admission controller, created from settings on first use."""
+    global _controller
+    if _controller is None:
+        settings = get_settings()
+        _controller = AdmissionController(
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue_depth=settings.llm_max_queue_depth,
+            target_latency=settings.llm_target_latency,
+            max_wait=settings.llm_max_queue_wait,
+        )
+    return _controller
+
+
+def set_admission_controller(controller: Union[AdmissionController, None]):
+    """Replaces the process-wide controller (None rebuilds it from settings on next use)."""
+    global _controller
+    _controller = controller
@@ -1,7 +1,63 @@
-from dotenv import load_dotenv
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-IDEAS_DIR = os.getenv("IDEAS_DIR", "data/ideas")
-PLANS_DIR = os.getenv("PLANS_DIR", "data/plans")
+LLM_MODES = ("live", "record", "replay")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application settings, read from the environment (and .env) once per process."""
+    gemini_api_key: Optional[str]
+    ideas_dir: str = "data/ideas"
+    plans_dir: str = "data/plans"
+    # Empty (or memory://) keeps locks and job state per process; set redis://host:6379/0 when running several workers
+    coordination_url: str = ""
+    # Admission control for LLM-backed routes (see app/admission.py)
+    llm_max_concurrency: int = 8
+    llm_max_queue_depth: int = 32
+    llm_target_latency: float = 20.0
+    llm_max_queue_wait: float = 30.0
+    # live calls Gemini; record also saves responses as cassettes; replay serves only cassettes (no network)
+    llm_mode: str = "live"
+    llm_cassette_dir: str = "data/cassettes"
+    llm_replay_latency_scale: float = 1.0 # 0 replays instantly
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Loads .env and parses settings on first use; later calls return the same object."""
+    from dotenv import load_dotenv  # Deferred so importing the app doesn't pay for it
+    load_dotenv()
+    llm_mode = os.getenv("LLM_MODE", "live").lower()
+    if llm_mode not in LLM_MODES:
+        raise ValueError(f"Unsupported LLM_MODE: {llm_mode} (expected one of {', '.join(LLM_MODES)})")
+    return Settings(
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        ideas_dir=os.getenv("IDEAS_DIR", "data/ideas"),
+        plans_dir=os.getenv("PLANS_DIR", "data/plans"),
+        coordination_url=os.getenv("COORDINATION_URL", ""),
+        llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        llm_max_queue_depth=int(os.getenv("LLM_MAX_QUEUE_DEPTH", "32")),
+        llm_target_latency=float(os.getenv("LLM_TARGET_LATENCY", "20")),
+        llm_max_queue_wait=float(os.getenv("LLM_MAX_QUEUE_WAIT", "30")),
+        llm_mode=llm_mode,
+        llm_cassette_dir=os.getenv("LLM_CASSETTE_DIR", "data/cassettes"),
+        llm_replay_latency_scale=float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1")),
+    )
+
+
+# Module-level names kept for existing imports (e.g. `from app.config import IDEAS_DIR`)
+_LEGACY_NAMES = {
+    "GEMINI_API_KEY": "gemini_api_key",
+    "IDEAS_DIR": "ideas_dir",
+    "PLANS_DIR": "plans_dir",
+    "COORDINATION_URL": "coordination_url",
+}
+
+
+def __getattr__(name: str):
+    if name in _LEGACY_NAMES:
+        return getattr(get_settings(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
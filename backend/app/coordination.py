@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+from fastapi import HTTPException
+from app.config import get_settings
+
+# Long enough to cover an LLM call with all its retries and backoff.
+DEFAULT_LOCK_TTL = 300.0
+DEFAULT_LOCK_TIMEOUT = 300.0
+# How long a request waits for another worker's build, and for a concurrent edit or
+# rollback, before giving up. The waiting request holds an admission slot meanwhile.
+BUILD_LOCK_TIMEOUT = 120.0
+EDIT_LOCK_TIMEOUT = 10.0
+LOCK_POLL_INTERVAL = 0.05
+JOB_TTL = 24 * 3600.0
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LockTimeout(Exception):
+    """Raised when a lock could not be acquired within the timeout."""
+
+
+def busy_error(status_code: int, detail: str, retry_after: int) -> HTTPException:
+    """The HTTP error for a LockTimeout: 409 when a conflicting change holds the lock, 503 when a build does."""
+    return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class Coordinator:
+    """Locks and job state shared by every worker serving the app.
+
+    The cache_* primitives only back job state and the readiness probe; graphs,
+    plans and progress events are not shared through them.
+
+    Subclasses implement the primitives (_acquire, _release, cache_*); the lock
+    and run_once helpers built on them behave the same for every backend.
+    """
+
+    async def _acquire(self, name: str, token: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def _release(self, name: str, token: str) -> bool:
+        raise NotImplementedError
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def cache_set(self, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def cache_delete(self, key: str):
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def lock(self, name: str, ttl: float = DEFAULT_LOCK_TTL, timeout: float = DEFAULT_LOCK_TIMEOUT):
+        """Holds a named lock across all workers; expires after `ttl` if the holder dies."""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while not await self._acquire(name, token, ttl):
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"Timed out waiting for lock {name!r}")
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            await self._release(name, token)
+
+    async def get_job(self, name: str) -> Optional[Dict[str, Any]]:
+        raw = await self.cache_get(f"job:{name}")
+        return json.loads(raw) if raw else None
+
+    async def set_job(self, name: str, state: str, **details: Any):
+        job = {"state": state, "worker": WORKER_ID, "updated_at": time.time(), **details}
+        await self.cache_set(f"job:{name}", json.dumps(job), ttl=JOB_TTL)
+
+    async def run_once(
+        self,
+        name: str,
+        produce: Callable[[], Awaitable[Any]],
+        load_existing: Callable[[], Awaitable[Any]],
+        fresh_since: Optional[float] = None,
+        timeout: float = DEFAULT_LOCK_TIMEOUT,
+    ) -> Any:
+        """Runs `produce` at most once across workers for concurrent callers.
+
+        Holds the lock `name` while producing, so other writers of the same
+        resource should take that lock too.
+        Callers that arrive while another worker is producing wait for the lock,
+        then return what `load_existing` finds instead of producing again. With
+        `fresh_since`, an existing result only counts if its job finished at or
+        after that time (used when the caller explicitly asked for a rebuild).
+        Raises LockTimeout if the lock isn't free within `timeout` seconds.
+        """
+        if fresh_since is None:
+            existing = await load_existing()
+            if existing is not None:
+                return existing
+
+        async with self.lock(name, timeout=timeout):
+            job = await self.get_job(name)
+            if fresh_since is None or (job and job["state"] == "done" and job.get("finished_at", 0) >= fresh_since):
+                existing = await load_existing()
+                if existing is not None:
+                    return existing
+
+            await self.set_job(name, "running", started_at=time.time())
+            try:
+                result = await produce()
+            except Exception as e:
+                await self.set_job(name, "failed", error=str(e), finished_at=time.time())
+                raise
+            await self.set_job(name, "done", finished_at=time.time())
+            return result
+
+
+class InMemoryCoordinator(Coordinator):
+    """Single-process backend; the default when no COORDINATION_URL is configured."""
+
+    def __init__(self):
+        self._locks: Dict[str, tuple] = {}
+        self._cache: Dict[str, tuple] = {}
+
+    async def _acquire(self, name: str, token: str, ttl: float) -> bool:
+        now = time.monotonic()
+        held = self._locks.get(name)
+        if held and held[1] > now:
+            return False
+        self._locks[name] = (token, now + ttl)
+        return True
+
+    async def _release(self, name: str, token: str) -> bool:
+        held = self._locks.get(name)
+        if held and held[0] == token:
+            del self._locks[name]
+            return True
+        return False
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        return value
+
+    async def cache_set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._cache[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    async def cache_delete(self, key: str):
+        self._cache.pop(key, None)
+
+
+# Deletes the lock only if it still holds our token, so an expired-and-retaken
+# lock is never released by its previous owner.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCoordinator(Coordinator):
+    """Redis-backed coordination shared by every worker pointing at the same server.
+
+    Takes any client speaking the redis.asyncio API, so tests can pass a
+    fakeredis instance; from_url() needs the optional `redis` package.
+    """
+
+    def __init__(self, client: Any, prefix: str = "planner:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "planner:") -> "RedisCoordinator":
+        import redis.asyncio as redis_asyncio  # Optional dependency, only needed for Redis deployments
+        return cls(redis_asyncio.Redis.from_url(url, decode_responses=True), prefix=prefix)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def _acquire(self, name: str, token: str, ttl: float) -> bool:
+        return bool(await self.client.set(self._key(f"lock:{name}"), token, nx=True, px=int(ttl * 1000)))
+
+    async def _release(self, name: str, token: str) -> bool:
+        return bool(await self.client.eval(_RELEASE_SCRIPT, 1, self._key(f"lock:{name}"), token))
+
+    async def cache_get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self._key(key))
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    async def cache_set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self.client.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    async def cache_delete(self, key: str):
+        await self.client.delete(self._key(key))
+
+
+_coordinator: Union[Coordinator, None] = None
+
+
+def create_coordinator(url: str) -> Coordinator:
+    """Builds a coordinator from a URL: empty or memory:// for in-process, redis:// or rediss:// for Redis."""
+    if not url or url.startswith("memory://"):
+        return InMemoryCoordinator()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCoordinator.from_url(url)
+    raise ValueError(f"Unsupported COORDINATION_URL: {url}")
+
+
+def get_coordinator() -> Coordinator:
+    """Returns the process-wide coordinator, creating it from COORDINATION_URL on first use."""
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = create_coordinator(get_settings().coordination_url)
+    return _coordinator
+
+
+def set_coordinator(coordinator: Union[Coordinator, None]):
+    """Replaces the process-wide coordinator (None resets it to be rebuilt from config)."""
+    global _coordinator
+    _coordinator = coordinator
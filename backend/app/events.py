@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+# Events buffered per subscriber before the oldest ones are dropped.
+SUBSCRIBER_BUFFER_SIZE = 100
+# Recent events kept per idea so a reconnecting client (Last-Event-ID) can catch up.
+HISTORY_SIZE = 50
+# Ideas whose history is kept in memory; least recently published are evicted first.
+MAX_TRACKED_IDEAS = 1000
+
+_current_idea: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_idea", default=None)
+
+
+def set_current_idea(idea_id: str):
+    """Marks the idea the current request works on, so emit() knows where to publish."""
+    _current_idea.set(idea_id)
+
+
+class Subscription:
+    """One subscriber's bounded event buffer.
+
+    Publishing never blocks: when the buffer is full the oldest event is dropped
+    and counted. The next get() reports the gap as an "events.dropped" event so
+    the client knows to refetch state instead of trusting the stream.
+    """
+
+    def __init__(self, bus: "EventBus", idea_id: str, maxsize: int):
+        self.bus = bus
+        self.idea_id = idea_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.reset = False  # Resumed from an event id this bus didn't issue
+
+    def offer(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Waits for the next event; raises asyncio.TimeoutError after `timeout` seconds."""
+        if self.reset:
+            self.reset = False
+            return {"id": None, "event": "events.reset", "data": {}, "ts": time.time()}
+        if self.dropped:
+            count, self.dropped = self.dropped, 0
+            return {"id": None, "event": "events.dropped", "data": {"count": count}, "ts": time.time()}
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """In-process pub/sub of pipeline progress events, keyed by idea id.
+
+    Events only reach subscribers in the same process: with several workers,
+    /events needs sticky sessions (see the README). Event ids are
+    "<epoch>-<sequence>" with a random epoch per bus, so a Last-Event-ID
+    issued by another worker (or before a restart) is never mistaken for one
+    of ours; such a subscriber gets "events.reset" instead of a wrong replay.
+    """
+
+    def __init__(self, buffer_size: int = SUBSCRIBER_BUFFER_SIZE, history_size: int = HISTORY_SIZE):
+        self.buffer_size = buffer_size
+        self.history_size = history_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._sequence = 0
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def _resume_point(self, last_event_id: str) -> Optional[int]:
+        epoch, _, sequence = last_event_id.partition("-")
+        return int(sequence) if epoch == self.epoch and sequence.isdigit() else None
+
+    def subscribe(self, idea_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """Registers a subscriber; with last_event_id, buffered events after it are replayed first."""
+        subscription = Subscription(self, idea_id, self.buffer_size)
+        if last_event_id:
+            resume_after = self._resume_point(last_event_id)
+            if resume_after is None:
+                subscription.reset = True
+            else:
+                for event in self._history.get(idea_id, ()):
+                    if event["seq"] > resume_after:
+                        subscription.offer(event)
+        self._subscribers.setdefault(idea_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.idea_id)
+        if subscribers:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.idea_id]
+
+    def subscriber_count(self, idea_id: str) -> int:
+        return len(self._subscribers.get(idea_id, ()))
+
+    def publish(self, idea_id: str, event: str, **data: Any) -> Dict[str, Any]:
+        """Publishes an event to every subscriber of the idea without blocking."""
+        self._sequence += 1
+        message = {"id": f"{self.epoch}-{self._sequence}", "seq": self._sequence, "event": event, "data": data, "ts": time.time()}
+
+        history = self._history.get(idea_id)
+        if history is None:
+            history = self._history[idea_id] = deque(maxlen=self.history_size)
+            if len(self._history) > MAX_TRACKED_IDEAS:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(idea_id)
+        history.append(message)
+
+        for subscription in list(self._subscribers.get(idea_id, ())):
+            subscription.offer(message)
+        return message
+
+    def history(self, idea_id: str) -> List[Dict[str, Any]]:
+        return list(self._history.get(idea_id, ()))
+
+
+event_bus = EventBus()
+
+
+def publish(idea_id: str, event: str, **data: Any):
+    """Publishes an event for an idea on the shared bus."""
+    event_bus.publish(idea_id, event, **data)
+
+
+def emit(event: str, **data: Any):
+    """Publishes an event for the idea set with set_current_idea(); no-op outside a request for an idea."""
+    idea_id = _current_idea.get()
+    if idea_id is not None:
+        event_bus.publish(idea_id, event, **data)
+
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """Formats an event as a Server-Sent Events frame."""
+    lines = []
+    if message.get("id") is not None:
+        lines.append(f"id: {message['id']}")
+    lines.append(f"event: {message['event']}")
+    lines.append(f"data: {json.dumps({'data': message['data'], 'ts': message['ts']})}")
+    return "\n".join(lines) + "\n\n"
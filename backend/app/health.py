@@ -0,0 +1,65 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Dict
+from app.config import get_settings
+from app.coordination import get_coordinator
+
+COORDINATION_CHECK_TIMEOUT = 2.0
+
+
+def _check_directory(path: str) -> Dict[str, Any]:
+    try:
+        os.makedirs(path, exist_ok=True)
+        probe = os.path.join(path, f".ready-{uuid.uuid4().hex}")
+        with open(probe, "w") as f:
+            f.write("ok")
+        os.remove(probe)
+        return {"ok": True, "path": path}
+    except OSError as e:
+        return {"ok": False, "path": path, "error": str(e)}
+
+
+async def _check_coordination() -> Dict[str, Any]:
+    coordinator = get_coordinator()
+    key = f"ready:{uuid.uuid4().hex}"
+    try:
+        await asyncio.wait_for(coordinator.cache_set(key, "ok", ttl=10), COORDINATION_CHECK_TIMEOUT)
+        value = await asyncio.wait_for(coordinator.cache_get(key), COORDINATION_CHECK_TIMEOUT)
+        await coordinator.cache_delete(key)
+        return {"ok": value == "ok", "backend": type(coordinator).__name__}
+    except Exception as e:
+        return {"ok": False, "backend": type(coordinator).__name__, "error": repr(e)}
+
+
+def _check_llm() -> Dict[str, Any]:
+    settings = get_settings()
+    if settings.llm_mode == "replay":
+        # Replay never touches the network; it only needs recorded cassettes.
+        return {"ok": os.path.isdir(settings.llm_cassette_dir), "mode": "replay", "critical": False}
+    # Warm the HTTP client import here, so the first real request doesn't pay for it.
+    import httpx  # noqa: F401
+    # Stored graphs and plans can still be served without a key, so this isn't critical.
+    return {"ok": bool(settings.gemini_api_key), "mode": settings.llm_mode, "critical": False}
+
+
+async def run_readiness_checks() -> Dict[str, Any]:
+    """Loads settings and lazily-imported dependencies and checks storage and coordination.
+
+    Returns {"ready": bool, "checks": {...}}; only checks not marked
+    "critical": False decide readiness.
+    """
+    try:
+        settings = get_settings()
+    except Exception as e:
+        return {"ready": False, "checks": {"settings": {"ok": False, "error": repr(e)}}}
+
+    checks = {
+        "settings": {"ok": True},
+        "ideas_dir": _check_directory(settings.ideas_dir),
+        "plans_dir": _check_directory(settings.plans_dir),
+        "coordination": await _check_coordination(),
+        "llm": _check_llm(),
+    }
+    ready = all(check["ok"] for check in checks.values() if check.get("critical", True))
+    return {"ready": ready, "checks": checks}
@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli  # Optional: only used when installed
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the framing overhead isn't worth it.
+MIN_COMPRESS_SIZE = 500
+
+
+def compute_etag(body: bytes) -> str:
+    """Returns a strong ETag (quoted SHA-256 prefix) for the given body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header against the identity ETag of a resource.
+
+    Encoded representations carry a suffixed ETag (e.g. "<hash>-gzip"), so the
+    suffix is stripped before comparing against the content hash.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.split("-", 1)[0] == base:
+            return True
+    return False
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks the best supported content coding from an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def cached_json_response(request: Request, content: Any) -> Response:
+    """Serializes content to JSON and serves it with ETag, 304 and compression support."""
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+    etag = compute_etag(body)
+    headers = {
+        "Cache-Control": "no-cache",  # Always revalidate; 304s make that cheap
+        "Vary": "Accept-Encoding",
+    }
+
+    encoding = None
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoding = _choose_encoding(request.headers.get("accept-encoding", ""))
+    # The 304 must carry the same validator the 200 would have, so the encoding is picked first.
+    headers["ETag"] = f'"{etag[1:-1]}-{encoding}"' if encoding else etag
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding == "br":
+        body = brotli.compress(body)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
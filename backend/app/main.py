@@ -1,9 +1,20 @@
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.idea_service import ingest_idea, generate_questions, submit_answers
-from app.services.graph_service import build_graph
-from app.services.plan_service import get_plan
-from app.models import GraphEditRequest # Import the new model
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.services.idea_service import ingest_idea, generate_questions, submit_answers, submit_answers_stream, update_answer, delete_answer
+from app.services.graph_service import build_graph, build_graph_with_llm, edit_graph_with_llm, load_graph, list_graph_versions, diff_graph_versions, rollback_graph
+from app.services.plan_service import get_plan, load_plan, list_plan_versions, diff_plan_versions, rollback_plan
+from app.models import GraphEditRequest, AnswerUpdate # Import the new model
+from app.http_cache import cached_json_response
+from app.events import event_bus, format_sse
+from app.health import run_readiness_checks
+from app.admission import get_admission_controller
+from app.services.export_service import export_plan
+
+# Seconds between SSE keep-alive comments when an idea is idle
+EVENT_KEEPALIVE_SECONDS = 15
 
 app = FastAPI()
 
@@ -18,34 +29,122 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.get("/health/live")
+async def live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def ready():
+    report = await run_readiness_checks()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 @app.post("/ideas")
 async def create_idea(text: str = Query(...)):
     return {"idea_id": await ingest_idea(text)}
 
+@app.get("/ideas/{idea_id}/events")
+async def events(request: Request, idea_id: str):
+    """Server-Sent Events stream of pipeline progress for one idea."""
+    subscription = event_bus.subscribe(idea_id, last_event_id=request.headers.get("last-event-id"))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/ideas/{idea_id}/questions")
 async def questions(idea_id: str):
-    return {"questions": await generate_questions(idea_id)}
+    async with get_admission_controller().slot("questions"):
+        return {"questions": await generate_questions(idea_id)}
 
 @app.post("/ideas/{idea_id}/answers")
 async def answers(idea_id: str, answers: dict):
     await submit_answers(idea_id, answers)
     return {"status": "saved"}
 
-from app.services.graph_service import build_graph_with_llm
+@app.post("/ideas/{idea_id}/answers/stream")
+async def answers_stream(request: Request, idea_id: str):
+    count = await submit_answers_stream(idea_id, request.stream())
+    return {"status": "saved", "count": count}
+
+@app.put("/ideas/{idea_id}/answers/{question_id}")
+async def answer_update(idea_id: str, question_id: str, update: AnswerUpdate):
+    await update_answer(idea_id, question_id, update.answer)
+    return {"status": "saved"}
 
-from app.services.graph_service import build_graph_with_llm, edit_graph_with_llm
+@app.delete("/ideas/{idea_id}/answers/{question_id}")
+async def answer_delete(idea_id: str, question_id: str):
+    await delete_answer(idea_id, question_id)
+    return {"status": "deleted"}
 
 @app.get("/ideas/{idea_id}/graph")
-async def graph(idea_id: str):
-    return await build_graph_with_llm(idea_id)
+async def graph(request: Request, idea_id: str, regenerate: bool = Query(False)):
+    # Serve the saved graph when there is one; only rebuild with the LLM on request,
+    # or when the saved graph is a draft left by an earlier LLM failure.
+    graph_obj = None if regenerate else await load_graph(idea_id, include_draft=False)
+    if graph_obj is None:
+        async with get_admission_controller().slot("graph"):
+            graph_obj = await build_graph_with_llm(idea_id, regenerate=regenerate)
+    return cached_json_response(request, graph_obj)
 
 @app.post("/ideas/{idea_id}/graph/edit")
 async def edit_graph(idea_id: str, request: GraphEditRequest): # Use the new model
-    return await edit_graph_with_llm(idea_id, request.user_text_input)
+    async with get_admission_controller().slot("graph_edit"):
+        return await edit_graph_with_llm(idea_id, request.user_text_input)
+
+@app.get("/ideas/{idea_id}/graph/versions")
+async def graph_versions(idea_id: str):
+    return {"versions": list_graph_versions(idea_id)}
+
+@app.get("/ideas/{idea_id}/graph/versions/diff")
+async def graph_versions_diff(idea_id: str, from_version: int = Query(...), to_version: int = Query(...)):
+    return diff_graph_versions(idea_id, from_version, to_version)
+
+@app.post("/ideas/{idea_id}/graph/versions/{version}/rollback")
+async def graph_rollback(idea_id: str, version: int):
+    return await rollback_graph(idea_id, version)
 
 @app.get("/ideas/{idea_id}/plan")
-async def plan(idea_id: str):
-    plan_obj = await get_plan(idea_id)
+async def plan(request: Request, idea_id: str, regenerate: bool = Query(False)):
+    # Like the graph, only queue for an LLM slot when the plan has to be generated.
+    plan_obj = None if regenerate else await load_plan(idea_id)
+    if plan_obj is None:
+        async with get_admission_controller().slot("plan"):
+            plan_obj = await get_plan(idea_id, regenerate=regenerate)
+    return cached_json_response(request, {"plan": plan_obj.markdown})
+
+@app.get("/ideas/{idea_id}/plan/export")
+async def plan_export(idea_id: str, format: Literal["html", "json", "csv"] = Query("json")):
+    # Renders the saved plan only; exporting never generates one.
+    chunks, media_type, filename = await export_plan(idea_id, format)
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'inline; filename="{filename}"'})
+
+@app.get("/ideas/{idea_id}/plan/versions")
+async def plan_versions(idea_id: str):
+    return {"versions": list_plan_versions(idea_id)}
+
+@app.get("/ideas/{idea_id}/plan/versions/diff")
+async def plan_versions_diff(idea_id: str, from_version: int = Query(...), to_version: int = Query(...)):
+    return {"diff": diff_plan_versions(idea_id, from_version, to_version)}
+
+@app.post("/ideas/{idea_id}/plan/versions/{version}/rollback")
+async def plan_rollback(idea_id: str, version: int):
+    plan_obj = await rollback_plan(idea_id, version)
     return {"plan": plan_obj.markdown}
@@ -1,19 +1,110 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict
+import uuid
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+def question_id(text: str) -> str:
+    """Stable id for a question: the same text always gets the same id."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, text).hex[:12]
+
+class Question(BaseModel):
+    id: str = ""
+    question: str
+
+    @model_validator(mode="after")
+    def _default_id(self):
+        if not self.id:
+            self.id = question_id(self.question)
+        return self
 
 class Idea(BaseModel):
     id: str
     text: str
-    questions: List[str] = []
-    answers: Dict[str, str] = {}
+    questions: List[Question] = []
+    answers: Dict[str, str] = {} # Keyed by question id
 
-class Question(BaseModel):
-    question: str
+    # question id -> position in `questions`, and question text -> id; rebuilt by set_questions()
+    _index: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _ids_by_text: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _migrate_legacy(cls, data: Any) -> Any:
+        """Accepts the old layout: questions as plain strings and answers keyed by question text."""
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        questions = [
+            {"question": q} if isinstance(q, str) else q
+            for q in data.get("questions") or []
+        ]
+        known = {}
+        for q in questions:
+            q_id = q.id if isinstance(q, Question) else q.get("id") or question_id(q["question"])
+            q_text = q.question if isinstance(q, Question) else q["question"]
+            known[q_id] = q_id
+            known[q_text] = q_id
+        answers = {}
+        for key, answer in (data.get("answers") or {}).items():
+            if key not in known:
+                # An answer to a question we have no record of: keep it, with the key as the question text
+                questions.append({"question": key})
+                known[key] = question_id(key)
+            answers[known[key]] = answer
+        data["questions"] = questions
+        data["answers"] = answers
+        return data
+
+    def model_post_init(self, __context: Any):
+        self._build_index()
+
+    def _build_index(self):
+        self._index = {q.id: i for i, q in enumerate(self.questions)}
+        self._ids_by_text = {q.question: q.id for q in self.questions}
+
+    def set_questions(self, texts: List[str]) -> List[Question]:
+        """Replaces the questions, keeping answered questions that aren't in `texts` at the end.
+
+        Regenerated questions rarely come back word for word, and an answer is
+        user input we can't get back, so it outlives its question's removal
+        (delete_answer removes it explicitly).
+        """
+        # Same text means same id, so repeated questions are kept only once
+        questions = {q.id: q for q in (Question(question=text) for text in texts)}
+        for q in self.questions:
+            if q.id in self.answers and q.id not in questions:
+                questions[q.id] = q
+        self.questions = list(questions.values())
+        self._build_index()
+        return self.questions
+
+    def get_question(self, q_id: str) -> Optional[Question]:
+        position = self._index.get(q_id)
+        return None if position is None else self.questions[position]
+
+    def resolve_question_id(self, key: str) -> Optional[str]:
+        """Maps a question id or the question's full text to its id (O(1)); None if unknown."""
+        if key in self._index:
+            return key
+        return self._ids_by_text.get(key)
+
+    def iter_qa_pairs(self) -> Iterator[Tuple[str, str]]:
+        """Yields (question text, answer) for answered questions, in question order."""
+        for q in self.questions:
+            answer = self.answers.get(q.id)
+            if answer is not None:
+                yield q.question, answer
+
+    def render_qa_pairs(self) -> str:
+        """Q&A pairs as prompt text, one "question: answer" per line."""
+        return "\n".join(f"{q}: {a}" for q, a in self.iter_qa_pairs())
 
 class Answer(BaseModel):
     question: str
     answer: str
 
+class AnswerUpdate(BaseModel):
+    answer: str
+
 class Node(BaseModel):
     id: str
     label: str
@@ -0,0 +1,335 @@
+import csv
+import hashlib
+import html
+import io
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from app.models import Graph
+from app.services.graph_service import load_graph
+from app.services.plan_service import load_plan
+
+# Parsed plans kept in memory, keyed by the sha256 of their markdown.
+AST_CACHE_SIZE = 128
+
+# Graph relations (normalized) meaning "from_node needs to_node done first", and the reverse.
+DEPENDENCY_RELATIONS = frozenset({
+    "depends on", "requires", "needs", "uses", "follows", "is built with", "is powered by", "integrates with",
+})
+REVERSE_DEPENDENCY_RELATIONS = frozenset({"precedes", "enables", "is required by", "is needed by", "produces"})
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM_RE = re.compile(r"^(?:[-*+]|\d+[.)])\s+(.*)$")
+_BOLD_LEAD_RE = re.compile(r"^\*\*(.+?)\*\*\s*[:\-–]?\s*(.*)$")
+_INLINE_MARKUP_RE = re.compile(r"\*\*|__|`")
+_FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+
+
+@dataclass(slots=True)
+class PlanTask:
+    id: str  # "<phase>.<task>", 1-based
+    title: str
+    description: str = ""
+
+
+@dataclass(slots=True)
+class PlanPhase:
+    title: str
+    description: str = ""
+    tasks: List[PlanTask] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class PlanDocument:
+    title: str
+    intro: str
+    phases: List[PlanPhase]
+    content_hash: str
+
+
+def _clean(text: str) -> str:
+    return _INLINE_MARKUP_RE.sub("", text).strip().rstrip(":").strip()
+
+
+def _split_item(text: str) -> Tuple[str, str]:
+    """Splits "**Title:** details" list items into (title, details)."""
+    match = _BOLD_LEAD_RE.match(text)
+    if match:
+        return _clean(match.group(1)), match.group(2).strip()
+    return _clean(text), ""
+
+
+def _append(existing: str, line: str) -> str:
+    return f"{existing}\n{line}" if existing else line
+
+
+def _fenced_lines(lines: List[str]) -> List[bool]:
+    """Flags the lines inside (or opening/closing) ``` and ~~~ code fences."""
+    flags = []
+    fence = None
+    for line in lines:
+        match = _FENCE_RE.match(line)
+        if fence is None:
+            if match:
+                fence = match.group(1)
+            flags.append(fence is not None)
+        else:
+            # A fence closes with the same character, at least as long as the opener
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                fence = None
+            flags.append(True)
+    return flags
+
+
+def parse_plan(markdown: str) -> PlanDocument:
+    """Parses plan markdown into phases and tasks (without dependencies).
+
+    A lone top-level heading becomes the title. The shallowest remaining
+    heading level marks phases; deeper headings, or top-level list items
+    under a phase, become tasks. Everything else is description text of the
+    nearest task, phase or the intro. Plans without headings become one phase.
+    Lines in fenced code blocks are always description text, so "# comments"
+    in shell or Python snippets aren't read as headings.
+    """
+    lines = markdown.splitlines()
+    fenced = _fenced_lines(lines)
+    headings = [(i, m) for i, m in enumerate(map(_HEADING_RE.match, lines)) if m and not fenced[i]]
+    levels = [len(m.group(1)) for _, m in headings]
+    title = "Plan"
+    title_line = None
+    if levels and levels.count(min(levels)) == 1 and len(levels) > 1:
+        title_line = next(i for i, m in headings if len(m.group(1)) == min(levels))
+        title = _clean(_HEADING_RE.match(lines[title_line]).group(2))
+        levels.remove(min(levels))
+    phase_level = min(levels) if levels else None
+
+    intro = ""
+    phases: List[PlanPhase] = []
+    task: Optional[PlanTask] = None
+    task_from_heading = False
+
+    def current_phase() -> PlanPhase:
+        if not phases:
+            phases.append(PlanPhase(title=title))
+        return phases[-1]
+
+    def add_task(task_title: str, description: str = "") -> PlanTask:
+        phase = current_phase()
+        new_task = PlanTask(id=f"{len(phases)}.{len(phase.tasks) + 1}", title=task_title, description=description)
+        phase.tasks.append(new_task)
+        return new_task
+
+    for i, line in enumerate(lines):
+        if i == title_line or not line.strip():
+            continue
+        if fenced[i]:
+            text = line.rstrip()
+            if task is not None:
+                task.description = _append(task.description, text)
+            elif phases:
+                phases[-1].description = _append(phases[-1].description, text)
+            else:
+                intro = _append(intro, text)
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            if len(heading.group(1)) == phase_level:
+                phases.append(PlanPhase(title=_clean(heading.group(2))))
+                task, task_from_heading = None, False
+            else:
+                task, task_from_heading = add_task(_clean(heading.group(2))), True
+            continue
+        item = _LIST_ITEM_RE.match(line)
+        if item and not task_from_heading and (phases or phase_level is None):
+            task = add_task(*_split_item(item.group(1)))
+        elif task is not None:
+            task.description = _append(task.description, line.strip())
+        elif phases:
+            phases[-1].description = _append(phases[-1].description, line.strip())
+        else:
+            intro = _append(intro, line.strip())
+
+    return PlanDocument(
+        title=title,
+        intro=intro,
+        phases=phases,
+        content_hash=hashlib.sha256(markdown.encode("utf-8")).hexdigest(),
+    )
+
+
+_ast_cache: "OrderedDict[str, PlanDocument]" = OrderedDict()
+
+
+def get_plan_ast(markdown: str) -> PlanDocument:
+    """Returns the parsed plan, reusing the cached AST when the markdown hasn't changed."""
+    key = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+    document = _ast_cache.get(key)
+    if document is not None:
+        _ast_cache.move_to_end(key)
+        return document
+    document = parse_plan(markdown)
+    _ast_cache[key] = document
+    if len(_ast_cache) > AST_CACHE_SIZE:
+        _ast_cache.popitem(last=False)
+    return document
+
+
+def link_dependencies(document: PlanDocument, graph: Optional[Graph]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Maps each task id to (graph node ids it mentions, ids of tasks it depends on).
+
+    A task mentions a node when the node's label appears in its title or
+    description. Each dependency edge between two nodes makes the tasks about
+    the dependent node depend on the first task about the prerequisite, where
+    "about" means named in the title (falling back to any mention). Only
+    earlier tasks count, so dependencies never form cycles.
+    """
+    tasks = [task for phase in document.phases for task in phase.tasks]
+    links: Dict[str, Tuple[List[str], List[str]]] = {task.id: ([], []) for task in tasks}
+    if graph is None:
+        return links
+
+    patterns = {
+        node.id: re.compile(rf"\b{re.escape(node.label.lower())}\b")
+        for node in graph.nodes
+        if node.type != "idea" and len(node.label) >= 3
+    }
+    in_title: Dict[str, List[int]] = {}
+    anywhere: Dict[str, List[int]] = {}
+    for position, task in enumerate(tasks):
+        title = task.title.lower()
+        description = task.description.lower()
+        for node_id, pattern in patterns.items():
+            if pattern.search(title):
+                in_title.setdefault(node_id, []).append(position)
+            elif not pattern.search(description):
+                continue
+            anywhere.setdefault(node_id, []).append(position)
+            links[task.id][0].append(node_id)
+
+    def about(node_id: str) -> List[int]:
+        return in_title.get(node_id) or anywhere.get(node_id, [])
+
+    for edge in graph.edges:
+        relation = edge.relation.lower().replace("_", " ").strip()
+        if relation in DEPENDENCY_RELATIONS:
+            dependent, prerequisite = edge.from_node, edge.to_node
+        elif relation in REVERSE_DEPENDENCY_RELATIONS:
+            dependent, prerequisite = edge.to_node, edge.from_node
+        else:
+            continue
+        prerequisite_positions = about(prerequisite)
+        if not prerequisite_positions:
+            continue
+        first = prerequisite_positions[0]
+        for position in about(dependent):
+            depends_on = links[tasks[position].id][1]
+            if first < position and tasks[first].id not in depends_on:
+                depends_on.append(tasks[first].id)
+
+    for node_ids, depends_on in links.values():
+        depends_on.sort(key=lambda task_id: tuple(int(part) for part in task_id.split(".")))
+    return links
+
+
+def _iter_tasks(document: PlanDocument, links) -> Iterator[Tuple[PlanPhase, PlanTask, List[str], List[str]]]:
+    for phase in document.phases:
+        for task in phase.tasks:
+            node_ids, depends_on = links[task.id]
+            yield phase, task, node_ids, depends_on
+
+
+def render_json(document: PlanDocument, links, idea_id: str) -> Iterator[str]:
+    """Streams {"idea_id", "title", "intro", "phases": [{"title", "description", "tasks": [...]}]} one phase at a time."""
+    yield f'{{"idea_id":{json.dumps(idea_id)},"title":{json.dumps(document.title)},"intro":{json.dumps(document.intro)},"phases":['
+    for index, phase in enumerate(document.phases):
+        tasks = [
+            {
+                "id": task.id,
+                "title": task.title,
+                "description": task.description,
+                "depends_on": links[task.id][1],
+                "graph_nodes": links[task.id][0],
+            }
+            for task in phase.tasks
+        ]
+        prefix = "," if index else ""
+        yield prefix + json.dumps({"title": phase.title, "description": phase.description, "tasks": tasks}, separators=(",", ":"))
+    yield "]}"
+
+
+def render_csv(document: PlanDocument, links, idea_id: str) -> Iterator[str]:
+    """Streams one row per task, in the column layout most trackers import directly."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(["task_id", "phase", "title", "description", "depends_on", "graph_nodes"])
+    yield flush()
+    for phase, task, node_ids, depends_on in _iter_tasks(document, links):
+        writer.writerow([task.id, phase.title, task.title, task.description, " ".join(depends_on), " ".join(node_ids)])
+        yield flush()
+
+
+def _html_text(text: str) -> str:
+    return "<br>".join(html.escape(line) for line in text.splitlines())
+
+
+def render_html(document: PlanDocument, links, idea_id: str) -> Iterator[str]:
+    """Streams a standalone HTML page, one phase at a time; dependencies link to their tasks."""
+    titles = {task.id: task.title for _, task, _, _ in _iter_tasks(document, links)}
+    yield (
+        f'<!DOCTYPE html>\n<html lang="en">\n<head><meta charset="utf-8"><title>{html.escape(document.title)}</title></head>\n<body>\n'
+        f"<h1>{html.escape(document.title)}</h1>\n"
+    )
+    if document.intro:
+        yield f"<p>{_html_text(document.intro)}</p>\n"
+    for phase in document.phases:
+        chunk = [f"<section>\n<h2>{html.escape(phase.title)}</h2>\n"]
+        if phase.description:
+            chunk.append(f"<p>{_html_text(phase.description)}</p>\n")
+        chunk.append("<ol>\n")
+        for task in phase.tasks:
+            chunk.append(f'<li id="task-{task.id}"><strong>{html.escape(task.title)}</strong>')
+            if task.description:
+                chunk.append(f"<p>{_html_text(task.description)}</p>")
+            depends_on = links[task.id][1]
+            if depends_on:
+                refs = ", ".join(f'<a href="#task-{dep}">{html.escape(titles[dep])}</a>' for dep in depends_on)
+                chunk.append(f'<p class="depends-on">Depends on: {refs}</p>')
+            chunk.append("</li>\n")
+        chunk.append("</ol>\n</section>\n")
+        yield "".join(chunk)
+    yield "</body>\n</html>\n"
+
+
+# Format -> (media type, file extension, renderer)
+EXPORT_FORMATS: Dict[str, Tuple[str, str, Callable[..., Iterator[str]]]] = {
+    "html": ("text/html; charset=utf-8", "html", render_html),
+    "json": ("application/json", "json", render_json),
+    "csv": ("text/csv; charset=utf-8", "csv", render_csv),
+}
+
+
+async def export_plan(idea_id: str, fmt: str) -> Tuple[Iterator[str], str, str]:
+    """Renders the saved plan as html, json or csv.
+
+    Returns (chunk iterator, media type, file name). Only saved plans and
+    graphs are read; a missing plan is a 404 and never triggers generation.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    plan = await load_plan(idea_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found for this idea.")
+    document = get_plan_ast(plan.markdown)
+    links = link_dependencies(document, await load_graph(idea_id))
+    media_type, extension, render = EXPORT_FORMATS[fmt]
+    return render(document, links, idea_id), media_type, f"{idea_id}_plan.{extension}"
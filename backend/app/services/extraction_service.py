@@ -0,0 +1,228 @@
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from app.models import Idea, Node, Edge, Graph
+
+# Words that never start, end or sit inside a key phrase. Includes filler verbs
+# that show up in idea descriptions ("develop a ...", "we want to build ...").
+STOPWORDS = frozenset("""
+a about above across all also am an and any are as at be been being both but by can could did do does
+doing done each either etc every few for from get gets had has have having he her here hers him his how
+i if in into is it its itself just let like may me might more most much must my neither no nor not of
+off on only or other our ours out over own per same she should so some such than that the their theirs
+them then there these they this those through to too under until up upon us very was we were what when
+where whether which while who whom whose why will with within without would yes yet you your yours
+want wants wanted develop develops developing create creates creating build builds make makes making
+implement implementing provide provides providing support supports supporting allow allows offer offers
+new main core mainly primarily mostly really basically simple simply various several many lot lots
+one two three first second third idea project something thing things way ways kind type types use
+""".split())
+
+# Negations, including contractions (kept whole by _TOKEN_RE). They are stopwords,
+# and one directly before a cue ("doesn't need") cancels that cue's relation.
+NEGATIONS = frozenset("""
+not no never cannot don't doesn't didn't won't wouldn't isn't aren't wasn't weren't can't couldn't
+shouldn't mustn't needn't haven't hasn't hadn't
+""".split())
+STOPWORDS = STOPWORDS | NEGATIONS
+
+# Dependency cue phrases mapped to the relation they express between the phrase
+# on their left and the phrase on their right.
+CUE_RELATIONS: Dict[Tuple[str, ...], str] = {
+    ("requires",): "depends on",
+    ("require",): "depends on",
+    ("needs",): "depends on",
+    ("need",): "depends on",
+    ("depends", "on"): "depends on",
+    ("depend", "on"): "depends on",
+    ("relies", "on"): "depends on",
+    ("rely", "on"): "depends on",
+    ("after",): "follows",
+    ("following",): "follows",
+    ("before",): "precedes",
+    ("uses",): "uses",
+    ("using",): "uses",
+    ("via",): "uses",
+    ("built", "with"): "is built with",
+    ("built", "on"): "is built with",
+    ("powered", "by"): "is powered by",
+    ("includes",): "includes",
+    ("including",): "includes",
+    ("such", "as"): "includes",
+    ("integrates", "with"): "integrates with",
+    ("integrate", "with"): "integrates with",
+    ("connects", "to"): "integrates with",
+    ("enables",): "enables",
+    ("enable",): "enables",
+    ("produces",): "produces",
+    ("generates",): "produces",
+    ("stores",): "stores",
+    ("for",): "serves",
+}
+# First token -> candidate cue sequences, longest first, so matching is one dict lookup.
+_CUES_BY_FIRST: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+for _cue, _relation in sorted(CUE_RELATIONS.items(), key=lambda item: -len(item[0])):
+    _CUES_BY_FIRST.setdefault(_cue[0], []).append((_cue, _relation))
+
+# Question keywords -> (relation from the idea, node type) for the answer's phrases.
+QUESTION_RELATIONS: List[Tuple[Tuple[str, ...], str, str]] = [
+    (("audience", "user", "users", "customer", "customers", "who"), "targets", "user"),
+    (("monetization", "monetize", "revenue", "pricing", "business", "pay"), "is monetized by", "business"),
+    (("technology", "technologies", "tech", "stack", "platform", "platforms", "integrate"), "is built with", "technology"),
+    (("budget", "timeline", "deadline", "constraint", "constraints", "limitation", "risk", "risks"), "is constrained by", "constraint"),
+    (("goal", "goals", "problem", "why", "purpose", "success", "measure"), "aims for", "goal"),
+    (("feature", "features", "functionality", "functionalities", "capabilities"), "has feature", "feature"),
+]
+DEFAULT_QUESTION_RELATION = ("is defined by", "feature")
+
+MAX_PHRASE_WORDS = 4
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#'\-]*|[,;:()/&|]|[.!?](?=\s|$)|\n")
+_SENTENCE_BREAKS = frozenset(".!?\n")
+
+
+@dataclass(slots=True)
+class Phrase:
+    key: str
+    label: str
+
+
+@dataclass(slots=True)
+class Extraction:
+    phrases: List[Phrase] = field(default_factory=list)
+    # (left phrase key, right phrase key, relation)
+    relations: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+def _singular(word: str) -> str:
+    """Cheap plural folding so 'users' and 'user' dedupe to one entity."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _is_participle(word: str) -> bool:
+    word = word.lower()
+    return len(word) > 4 and word.endswith("ed") and not word.endswith("eed")
+
+
+def normalize_phrase(words: List[str]) -> str:
+    """Returns the dedup key for a phrase: lowercased, plural-folded, space-joined."""
+    return " ".join(_singular(w.lower()) for w in words)
+
+
+def extract(text: str) -> Extraction:
+    """Extracts key phrases and cue-phrase relations from free text.
+
+    Phrases are maximal runs of non-stopword tokens (RAKE-style). A cue phrase
+    such as "requires" or "built with" links the nearest phrase before it to
+    the nearest phrase after it within the same sentence.
+    """
+    result = Extraction()
+    seen = set()
+    current: List[str] = []
+    left_key = None  # Last phrase seen in the current sentence
+    pending_relation = None  # Cue waiting for its right-hand phrase
+
+    def close_phrase():
+        nonlocal current, left_key, pending_relation
+        if not current:
+            return
+        words = current[-MAX_PHRASE_WORDS:]
+        current = []
+        if len(words) == 1 and (len(words[0]) < 2 or words[0].isdigit() or _is_participle(words[0])):
+            # Lone numbers and participles ("are generated after ...") aren't entities;
+            # dropping them lets a pending cue attach to the subject instead.
+            return
+        key = normalize_phrase(words)
+        if key not in seen:
+            seen.add(key)
+            result.phrases.append(Phrase(key=key, label=" ".join(words)))
+        if pending_relation and left_key and left_key != key:
+            result.relations.append((left_key, key, pending_relation))
+        pending_relation = None
+        left_key = key
+
+    tokens = _TOKEN_RE.findall(text.replace("\u2019", "'"))  # Curly apostrophes, as in "doesn’t"
+    lowered = [t.lower() for t in tokens]
+    i = 0
+    n = len(tokens)
+    while i < n:
+        low = lowered[i]
+        cues = _CUES_BY_FIRST.get(low)
+        if cues:
+            matched = None
+            for cue, relation in cues:
+                if tuple(lowered[i:i + len(cue)]) == cue:
+                    matched = (cue, relation)
+                    break
+            if matched:
+                close_phrase()
+                # "X doesn't need Y" states the opposite of a dependency, so no edge
+                pending_relation = None if i and lowered[i - 1] in NEGATIONS else matched[1]
+                i += len(matched[0])
+                continue
+        if low in _SENTENCE_BREAKS:
+            close_phrase()
+            left_key = None
+            pending_relation = None
+        elif low in STOPWORDS or not low[0].isalnum():
+            close_phrase()
+        else:
+            current.append(tokens[i])
+        i += 1
+    close_phrase()
+    return result
+
+
+def _classify_question(question: str) -> Tuple[str, str]:
+    words = set(re.findall(r"[a-z]+", question.lower()))
+    for keywords, relation, node_type in QUESTION_RELATIONS:
+        if not words.isdisjoint(keywords):
+            return relation, node_type
+    return DEFAULT_QUESTION_RELATION
+
+
+def _node_id(idea_id: str, key: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{idea_id}:{key}"))
+
+
+def extract_graph(idea: Idea) -> Graph:
+    """Builds a draft graph from an idea and its answers without calling the LLM.
+
+    Entities are deduplicated across the idea text and all answers; each one is
+    linked to the main idea (relation taken from the question it answers) and
+    to other entities wherever a dependency cue phrase connects them.
+    """
+    nodes: Dict[str, Node] = {}
+    mentions: Dict[str, int] = {}
+    edges: Dict[Tuple[str, str], Edge] = {}
+
+    def add_edge(from_id: str, to_id: str, relation: str):
+        if from_id != to_id and (from_id, to_id) not in edges:
+            edges[(from_id, to_id)] = Edge(from_node=from_id, to_node=to_id, relation=relation)
+
+    def add_extraction(extraction: Extraction, relation: str, node_type: str, notes: str):
+        for phrase in extraction.phrases:
+            node_id = _node_id(idea.id, phrase.key)
+            mentions[node_id] = mentions.get(node_id, 0) + 1
+            if node_id not in nodes:
+                nodes[node_id] = Node(id=node_id, label=phrase.label, type=node_type, notes=notes)
+            add_edge(idea.id, node_id, relation)
+        for left, right, cue_relation in extraction.relations:
+            add_edge(_node_id(idea.id, left), _node_id(idea.id, right), cue_relation)
+
+    add_extraction(extract(idea.text), "has feature", "feature", "From idea description")
+    for question, answer in idea.iter_qa_pairs():
+        relation, node_type = _classify_question(question)
+        add_extraction(extract(answer), relation, node_type, question)
+
+    # Entities mentioned more often matter more; the idea itself stays on top.
+    for node_id, node in nodes.items():
+        node.priority = min(4, mentions[node_id])
+
+    idea_node = Node(id=idea.id, label=idea.text, type="idea", priority=5, notes="Main idea")
+    return Graph(nodes=[idea_node, *nodes.values()], edges=list(edges.values()))
@@ -4,21 +4,71 @@ import uuid
 from typing import List
 from app.models import Idea, Node, Edge, Graph
 from app.storage import load_idea
-from app.config import IDEAS_DIR
+from app.config import get_settings
 from fastapi import HTTPException
 import asyncio
+import time
 from app.services.llm_client import LLMClient # Keep import at top
+from app.services.extraction_service import extract_graph
+from app.versioning import VersionStore, graph_delta, apply_graph_delta, graph_diff
+from app.events import publish, set_current_idea
+from app.admission import report_llm_failure
+from app.coordination import get_coordinator, busy_error, LockTimeout, BUILD_LOCK_TIMEOUT, EDIT_LOCK_TIMEOUT
 
-async def build_graph_with_llm(idea_id: str) -> Graph:
-    """Builds a graph using the LLM for dynamic, context-aware relations."""
-    idea = load_idea(idea_id, IDEAS_DIR)
+graph_versions = VersionStore("graph", lambda: get_settings().ideas_dir, graph_delta, apply_graph_delta)
+
+def _save_graph(idea_id: str, graph: Graph, source: str, draft: bool = False) -> str:
+    """Writes a graph to {IDEAS_DIR}/{idea_id}_graph.json, records it in the version history and returns the path.
+
+    A draft (the local extraction saved when the LLM was unavailable) is marked
+    in the file, so the next request that needs the graph retries the LLM build.
+    """
+    graph_file_path = os.path.join(get_settings().ideas_dir, f"{idea_id}_graph.json")
+    os.makedirs(os.path.dirname(graph_file_path), exist_ok=True)
+    graph_data = graph.model_dump()
+    with open(graph_file_path, "w") as f:
+        json.dump({**graph_data, "draft": True} if draft else graph_data, f, indent=4)
+    version = graph_versions.record(idea_id, graph_data, source=source)
+    publish(idea_id, "graph.saved", version=version, source=source)
+    return graph_file_path
+
+def _graph_lock_name(idea_id: str) -> str:
+    return f"graph:{idea_id}"
+
+async def build_graph_with_llm(idea_id: str, regenerate: bool = False) -> Graph:
+    """Builds a graph using the LLM for dynamic, context-aware relations.
+
+    Concurrent calls for the same idea, on any worker, share a single LLM build.
+    Without `regenerate` a saved (non-draft) graph is returned as-is.
+    """
+    try:
+        return await get_coordinator().run_once(
+            _graph_lock_name(idea_id),
+            produce=lambda: _build_graph_with_llm(idea_id),
+            load_existing=lambda: load_graph(idea_id, include_draft=False),
+            fresh_since=time.time() if regenerate else None,
+            timeout=BUILD_LOCK_TIMEOUT,
+        )
+    except LockTimeout:
+        raise busy_error(503, "The graph for this idea is still being built. Please retry shortly.", retry_after=30)
+
+def _graph_busy() -> HTTPException:
+    return busy_error(409, "Another change to this graph is in progress. Please retry shortly.", retry_after=2)
+
+async def _build_graph_with_llm(idea_id: str) -> Graph:
+    idea = load_idea(idea_id, get_settings().ideas_dir)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found.")
 
+    set_current_idea(idea_id)
+    publish(idea_id, "graph.started")
+
     # Prepare Q&A pairs for the prompt
-    qa_pairs = ""
-    for q, a in idea.answers.items():
-        qa_pairs += f"{q}: {a}\n"
+    qa_pairs = idea.render_qa_pairs()
+
+    # Local extraction gives the LLM a draft to refine, and is the fallback when it's unavailable
+    draft = extract_graph(idea)
+    publish(idea_id, "graph.draft", graph=draft.model_dump())
 
     # Render prompt
     with open(os.path.join(os.path.dirname(__file__), "../prompts/graph.txt"), "r") as f:
@@ -27,42 +77,62 @@ async def build_graph_with_llm(idea_id: str) -> Graph:
         prompt_template
         .replace("{{idea_text}}", idea.text)
         .replace("{{qa_pairs}}", qa_pairs.strip())
+        .replace("{{draft_graph}}", json.dumps(draft.model_dump()))
     )
 
     # Call LLM
+    import httpx  # Deferred like in llm_client; only needed once we actually call the LLM
     llm = LLMClient() # Instantiate LLMClient inside the function
-    llm_response = await llm.send_prompt(prompt)
+    try:
+        llm_response = await llm.send_prompt(prompt)
+    except httpx.HTTPError as e:
+        print(f"LLM unavailable ({e!r}); falling back to locally extracted graph.")
+        publish(idea_id, "graph.fallback", reason=repr(e))
+        report_llm_failure()  # The request succeeds, but the LLM didn't
+        # Saved so the graph can be shown and edited, but marked so it isn't served as the final graph
+        _save_graph(idea_id, draft, source="extraction", draft=True)
+        return draft
 
     # Parse JSON from LLM response
-    import json
     try:
         graph_data = json.loads(llm_response)
         nodes = [Node(**n) for n in graph_data.get("nodes", [])]
         edges = [Edge(**e) for e in graph_data.get("edges", [])]
         graph = Graph(nodes=nodes, edges=edges)
     except Exception as e:
+        publish(idea_id, "graph.failed", error=str(e))
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse LLM graph: {e}\nRaw LLM response: {llm_response}"
         )
+    publish(idea_id, "graph.parsed", nodes=len(graph.nodes), edges=len(graph.edges))
     
     # Save the generated graph to a JSON file
-    graph_file_path = os.path.join(IDEAS_DIR, f"{idea_id}_graph.json")
-    os.makedirs(os.path.dirname(graph_file_path), exist_ok=True)
-    with open(graph_file_path, "w") as f:
-        json.dump(graph.model_dump(), f, indent=4)
+    graph_file_path = _save_graph(idea_id, graph, source="llm")
     print(f"Graph saved to: {graph_file_path}") # Debugging line
 
     return graph
 
 async def edit_graph_with_llm(idea_id: str, user_text_input: str) -> Graph:
     """Edits an existing graph using the LLM based on user text input."""
-    graph_file_path = os.path.join(IDEAS_DIR, f"{idea_id}_graph.json")
+    # Serialize read-modify-write against builds, other edits and rollbacks on every worker
+    try:
+        async with get_coordinator().lock(_graph_lock_name(idea_id), timeout=EDIT_LOCK_TIMEOUT):
+            return await _edit_graph_with_llm(idea_id, user_text_input)
+    except LockTimeout:
+        raise _graph_busy()
+
+async def _edit_graph_with_llm(idea_id: str, user_text_input: str) -> Graph:
+    graph_file_path = os.path.join(get_settings().ideas_dir, f"{idea_id}_graph.json")
     if not os.path.exists(graph_file_path):
         raise HTTPException(status_code=404, detail="Graph not found for this idea.")
 
     with open(graph_file_path, "r") as f:
         existing_graph_data = json.load(f)
+    existing_graph_data.pop("draft", None)  # An edited draft is saved as a regular graph
+
+    set_current_idea(idea_id)
+    publish(idea_id, "graph.edit.started")
     
     # Render prompt for editing
     with open(os.path.join(os.path.dirname(__file__), "../prompts/edit_graph.txt"), "r") as f:
@@ -84,24 +154,31 @@ async def edit_graph_with_llm(idea_id: str, user_text_input: str) -> Graph:
         edges = [Edge(**e) for e in updated_graph_data.get("edges", [])]
         graph = Graph(nodes=nodes, edges=edges)
     except Exception as e:
+        publish(idea_id, "graph.failed", error=str(e))
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse LLM response for graph edit: {e}\nRaw LLM response: {llm_response}"
         )
+    publish(idea_id, "graph.parsed", nodes=len(graph.nodes), edges=len(graph.edges))
 
     # Save the updated graph to a JSON file
-    with open(graph_file_path, "w") as f:
-        json.dump(graph.model_dump(), f, indent=4)
+    _save_graph(idea_id, graph, source="edit")
 
     return graph
 
-async def load_graph(idea_id: str) -> Graph | None:
-    """Loads an existing graph from a JSON file."""
-    graph_file_path = os.path.join(IDEAS_DIR, f"{idea_id}_graph.json")
+async def load_graph(idea_id: str, include_draft: bool = True) -> Graph | None:
+    """Loads an existing graph from a JSON file.
+
+    With include_draft=False a fallback draft counts as missing, so callers
+    that would otherwise serve it as final try the LLM build again.
+    """
+    graph_file_path = os.path.join(get_settings().ideas_dir, f"{idea_id}_graph.json")
     if os.path.exists(graph_file_path):
         try:
             with open(graph_file_path, "r") as f:
                 graph_data = json.load(f)
+            if graph_data.get("draft") and not include_draft:
+                return None
             nodes = [Node(**n) for n in graph_data.get("nodes", [])]
             edges = [Edge(**e) for e in graph_data.get("edges", [])]
             return Graph(nodes=nodes, edges=edges)
@@ -111,42 +188,35 @@ async def load_graph(idea_id: str) -> Graph | None:
     return None
 
 async def build_graph(idea_id: str) -> Graph:
-    """Reads idea and answers, converts into nodes & edges with heuristics."""
-    idea = load_idea(idea_id, IDEAS_DIR)
+    """Builds a graph from the idea and its answers with local NLP extraction (no LLM call)."""
+    idea = load_idea(idea_id, get_settings().ideas_dir)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found.")
 
-    nodes: List[Node] = []
-    edges: List[Edge] = []
-
-    # Heuristic 1: Create a node for the main idea
-    nodes.append(Node(id=idea.id, label=idea.text, type="idea", priority=5, notes="Main idea"))
-
-    # Heuristic 2: Create nodes for each answer and link them to the main idea
-    relation_types = [
-        "is defined by",
-        "depends on",
-        "leads to",
-        "is a part of",
-        "has feature"
-    ]
-    for idx, (question, answer) in enumerate(idea.answers.items()):
-        # Simple tokenization/entity extraction (can be improved with NLP)
-        # For now, let's just create a node for each answer
-        node_id = str(uuid.uuid5(uuid.NAMESPACE_URL, answer))
-        nodes.append(Node(id=node_id, label=answer, type="feature", notes=question))
-        relation = relation_types[idx % len(relation_types)]
-        edges.append(Edge(from_node=idea.id, to_node=node_id, relation=relation))
-
-    # Heuristic 3: More advanced graph building would involve NLP to identify relationships
-    # between different answers/features, e.g., "depends_on", "uses_api", etc.
-    # For this POC, we'll keep it simple.
-
-    graph = Graph(nodes=nodes, edges=edges)
-
-    # Optionally save the graph to a JSON file
-    graph_file_path = os.path.join(IDEAS_DIR, f"{idea_id}_graph.json")
-    with open(graph_file_path, "w") as f:
-        json.dump(graph.model_dump(), f, indent=4)
+    graph = extract_graph(idea)
+    _save_graph(idea_id, graph, source="extraction")
+    return graph
+
+def list_graph_versions(idea_id: str) -> List[dict]:
+    """Returns the graph's version history (metadata only), oldest first."""
+    return graph_versions.list_versions(idea_id)
 
+def _get_graph_version(idea_id: str, version: int) -> dict:
+    graph_data = graph_versions.get(idea_id, version)
+    if graph_data is None:
+        raise HTTPException(status_code=404, detail=f"Graph version {version} not found.")
+    return graph_data
+
+def diff_graph_versions(idea_id: str, from_version: int, to_version: int) -> dict:
+    """Returns node/edge additions, removals and changes between two graph versions."""
+    return graph_diff(_get_graph_version(idea_id, from_version), _get_graph_version(idea_id, to_version))
+
+async def rollback_graph(idea_id: str, version: int) -> Graph:
+    """Restores a previous graph version locally (no LLM call); the restore is recorded as a new version."""
+    try:
+        async with get_coordinator().lock(_graph_lock_name(idea_id), timeout=EDIT_LOCK_TIMEOUT):
+            graph = Graph(**_get_graph_version(idea_id, version))
+            _save_graph(idea_id, graph, source=f"rollback:{version}")
+    except LockTimeout:
+        raise _graph_busy()
     return graph
@@ -1,11 +1,13 @@
+import json
 import uuid
 import os
-from typing import List, Dict
-from app.models import Idea
+from typing import AsyncIterator, List, Dict, Tuple
+from app.models import Idea, Question
 from app.storage import save_idea, load_idea
-from app.config import IDEAS_DIR
+from app.config import get_settings
 from fastapi import HTTPException
 from app.services.llm_client import LLMClient # Keep import at top
+from app.events import publish, set_current_idea
 
 async def ingest_idea(text: str) -> str:
     """Generates a UUID, stores raw idea in JSON, returns idea_id."""
@@ -13,15 +15,20 @@ async def ingest_idea(text: str) -> str:
         raise ValueError("Idea text cannot be empty.")
     idea_id = str(uuid.uuid4())
     idea = Idea(id=idea_id, text=text)
-    save_idea(idea, IDEAS_DIR)
+    save_idea(idea, get_settings().ideas_dir)
     return idea_id
 
-async def generate_questions(idea_id: str) -> List[str]:
+# Streamed answers are written to disk in batches of this many
+STREAM_SAVE_EVERY = 50
+
+async def generate_questions(idea_id: str) -> List[Question]:
     """Loads idea text, calls Gemini with questions.txt prompt, returns list."""
-    idea = load_idea(idea_id, IDEAS_DIR)
+    idea = load_idea(idea_id, get_settings().ideas_dir)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found.")
 
+    set_current_idea(idea_id)
+    publish(idea_id, "questions.started")
     prompt_template_path = os.path.join(os.path.dirname(__file__), "..", "prompts", "questions.txt")
     with open(prompt_template_path, "r") as f:
         prompt_template = f.read()
@@ -52,23 +59,110 @@ async def generate_questions(idea_id: str) -> List[str]:
         elif q.endswith('?'): # Catch any simple questions
             questions.append(q.replace('*', '').strip())
 
-    idea.questions = questions
-    save_idea(idea, IDEAS_DIR)
-    return questions
+    idea.set_questions(questions)
+    save_idea(idea, get_settings().ideas_dir)
+    publish(idea_id, "questions.done", questions=[q.model_dump() for q in idea.questions])
+    return idea.questions
 
-async def submit_answers(idea_id: str, answers: Dict[str, str]) -> None:
-    """Saves question-answer mapping to idea JSON."""
-    idea = load_idea(idea_id, IDEAS_DIR)
+def _load_idea_with_questions(idea_id: str) -> Idea:
+    idea = load_idea(idea_id, get_settings().ideas_dir)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found.")
 
     if not idea.questions:
         raise ValueError("No questions generated for this idea yet. Please generate questions first.")
+    return idea
+
+def _resolve_question(idea: Idea, key: str) -> str:
+    """Returns the question id for a question id or full question text."""
+    q_id = idea.resolve_question_id(key)
+    if q_id is None:
+        raise ValueError(f"Answer provided for unknown question: {key}")
+    return q_id
+
+async def submit_answers(idea_id: str, answers: Dict[str, str]) -> None:
+    """Saves answers (keyed by question id or question text) to idea JSON; other answers are kept."""
+    idea = _load_idea_with_questions(idea_id)
 
     # Validate that provided answers correspond to generated questions
-    for q in answers.keys():
-        if q not in idea.questions:
-            raise ValueError(f"Answer provided for unknown question: {q}")
+    resolved = {_resolve_question(idea, key): answer for key, answer in answers.items()}
+
+    idea.answers.update(resolved)
+    save_idea(idea, get_settings().ideas_dir)
+    publish(idea_id, "answers.saved", count=len(resolved))
+
+async def update_answer(idea_id: str, question_id: str, answer: str) -> None:
+    """Sets the answer to a single question."""
+    idea = _load_idea_with_questions(idea_id)
+    if idea.get_question(question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found.")
+    idea.answers[question_id] = answer
+    save_idea(idea, get_settings().ideas_dir)
+    publish(idea_id, "answers.saved", count=1)
+
+async def delete_answer(idea_id: str, question_id: str) -> None:
+    """Removes the answer to a single question."""
+    idea = _load_idea_with_questions(idea_id)
+    if idea.get_question(question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found.")
+    if idea.answers.pop(question_id, None) is not None:
+        save_idea(idea, get_settings().ideas_dir)
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Yields (1-based line number, line) for every non-blank line."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+def _parse_answer_line(idea: Idea, line: bytes) -> Tuple[str, str]:
+    """Returns (question id, answer) for one NDJSON line; raises ValueError when it's malformed."""
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid JSON ({e})")
+    if not isinstance(item, dict):
+        raise ValueError("expected a JSON object")
+    key = item.get("question_id") or item.get("question")
+    answer = item.get("answer")
+    if not key or not isinstance(key, str) or not isinstance(answer, str):
+        raise ValueError('each line needs "question_id" (or "question") and "answer"')
+    return _resolve_question(idea, key), answer
+
+async def submit_answers_stream(idea_id: str, chunks: AsyncIterator[bytes]) -> int:
+    """Saves answers sent as NDJSON, one {"question_id" | "question", "answer"} object per line.
 
-    idea.answers.update(answers)
-    save_idea(idea, IDEAS_DIR)
+    Answers are applied as they arrive and saved every STREAM_SAVE_EVERY lines,
+    so a stream that fails part-way keeps everything saved before the failure.
+    A bad line is a 400 naming the line and how many answers were already saved.
+    Returns the number of answers received.
+    """
+    idea = _load_idea_with_questions(idea_id)
+    received = 0
+    unsaved = 0
+    async for number, line in _iter_lines(chunks):
+        try:
+            question_id, answer = _parse_answer_line(idea, line)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"line {number}: {e}. {received - unsaved} answers from earlier lines were already saved.",
+            )
+        idea.answers[question_id] = answer
+        received += 1
+        unsaved += 1
+        if unsaved >= STREAM_SAVE_EVERY:
+            save_idea(idea, get_settings().ideas_dir)
+            publish(idea_id, "answers.saved", count=unsaved)
+            unsaved = 0
+    if unsaved:
+        save_idea(idea, get_settings().ideas_dir)
+        publish(idea_id, "answers.saved", count=unsaved)
+    return received
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Idea and node ids are random per idea, so they are masked before hashing.
+# Otherwise the same prompt for a freshly ingested idea would never match a recording.
+_UUID_RE = re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recording exists for a prompt."""
+
+
+def prompt_hash(prompt: str) -> str:
+    """sha256 of the prompt with UUIDs masked; the cassette key."""
+    return hashlib.sha256(_UUID_RE.sub("<id>", prompt).encode("utf-8")).hexdigest()
+
+
+def remap_ids(response: str, recorded_ids: List[str], prompt: str) -> str:
+    """Replaces the recorded prompt's UUIDs in a response with the current prompt's.
+
+    Prompts that share a cassette differ only in their UUIDs, at the same
+    positions, so the n-th UUID of the recorded prompt maps to the n-th UUID of
+    the current one. UUIDs the model made up itself are left alone.
+    """
+    mapping: Dict[str, str] = {}
+    for recorded, current in zip(recorded_ids, _UUID_RE.findall(prompt)):
+        mapping.setdefault(recorded.lower(), current)
+    if not mapping:
+        return response
+    return _UUID_RE.sub(lambda m: mapping.get(m.group(0).lower(), m.group(0)), response)
+
+
+class CassetteStore:
+    """Recorded LLM responses, one gzipped JSON file per prompt hash.
+
+    Entries are {"prompt_hash", "prompt_chars", "prompt_ids", "response",
+    "latency", "recorded_at"}. Prompt text isn't stored, which keeps cassettes
+    small and idea text off disk; "prompt_ids" (the prompt's UUIDs in order)
+    lets replay swap the recorded idea's ids for the current one's. Files are
+    read at most once per process; replay under load is served from memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def save(self, prompt: str, response: str, latency: float) -> str:
+        """Records a response (replacing any earlier one for the same prompt) and returns its key."""
+        key = prompt_hash(prompt)
+        entry = {
+            "prompt_hash": key,
+            "prompt_chars": len(prompt),
+            "prompt_ids": _UUID_RE.findall(prompt),
+            "response": response,
+            "latency": round(latency, 3),
+            "recorded_at": time.time(),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # Each writer gets its own temp file, so concurrent recorders of the same
+        # prompt can't interleave writes; the last complete file replaced in wins.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._cache[key] = entry
+        return key
+
+    def load(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Returns the recorded entry for a prompt, or None if there isn't one."""
+        key = prompt_hash(prompt)
+        entry = self._cache.get(key)
+        if entry is None:
+            path = self._path(key)
+            if not os.path.exists(path):
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            self._cache[key] = entry
+        return entry
+
+
+_stores: Dict[str, CassetteStore] = {}
+
+
+def get_cassette_store(directory: str) -> CassetteStore:
+    """Returns the shared store for a directory, so its memory cache survives across LLMClient instances."""
+    store = _stores.get(directory)
+    if store is None:
+        store = _stores[directory] = CassetteStore(directory)
+    return store
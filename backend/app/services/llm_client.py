@@ -1,22 +1,62 @@
-import httpx
 import os
 import asyncio # Import asyncio
-from app.config import GEMINI_API_KEY
+import time
+from app.config import get_settings
+from app.events import emit
+from app.services.llm_cassettes import CassetteMiss, get_cassette_store, prompt_hash, remap_ids
+
+_api_key_checked = False
+
+def _check_api_key():
+    """Warns about a missing API key once per process, on the first LLM call."""
+    global _api_key_checked
+    if _api_key_checked:
+        return
+    _api_key_checked = True
+    if not get_settings().gemini_api_key:
+        print("WARNING: GEMINI_API_KEY not set. LLM calls will likely fail or be very fast.")
 
 class LLMClient:
     def __init__(self):
-        if not GEMINI_API_KEY:
-            print("WARNING: GEMINI_API_KEY not set. LLM calls will likely fail or be very fast.")
-            # For testing, we might want to raise an error, but for now, let's just warn.
-            # raise ValueError("GEMINI_API_KEY not set in environment variables.")
-        else:
-            print(f"GEMINI_API_KEY is set (first 5 chars): {GEMINI_API_KEY[:5]}*****")
+        # Cheap on purpose: services create one per call. Settings and httpx are loaded on first send_prompt().
         self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
         self.headers = {
             "Content-Type": "application/json"
         }
 
     async def send_prompt(self, prompt: str) -> str:
+        """Returns the model's text for a prompt; LLM_MODE decides whether it comes from Gemini or a cassette."""
+        settings = get_settings()
+        if settings.llm_mode == "replay":
+            return await self._replay(prompt, settings)
+
+        emit("llm.request")
+        started = time.perf_counter()
+        llm_text = await self._send_live(prompt)
+        latency = time.perf_counter() - started
+        emit("llm.response", seconds=round(latency, 3))
+        if settings.llm_mode == "record":
+            get_cassette_store(settings.llm_cassette_dir).save(prompt, llm_text, latency)
+        # Add a small delay to avoid rate limiting after a successful call
+        await asyncio.sleep(1)
+        return llm_text
+
+    async def _replay(self, prompt: str, settings) -> str:
+        entry = get_cassette_store(settings.llm_cassette_dir).load(prompt)
+        if entry is None:
+            raise CassetteMiss(f"No recorded LLM response for prompt {prompt_hash(prompt)} in {settings.llm_cassette_dir}")
+        emit("llm.request", replay=True)
+        latency = entry["latency"] * settings.llm_replay_latency_scale
+        if latency > 0:
+            await asyncio.sleep(latency) # Keep the recorded timing so load tests see realistic concurrency
+        emit("llm.response", seconds=round(latency, 3), replay=True)
+        # The recording may be for another idea; give the response this prompt's ids
+        return remap_ids(entry["response"], entry.get("prompt_ids", []), prompt)
+
+    async def _send_live(self, prompt: str) -> str:
+        import httpx  # Deferred: it's the heaviest import in the app and only needed for real LLM calls
+        _check_api_key()
+        api_key = get_settings().gemini_api_key
         payload = {
             "contents": [
                 {
@@ -31,7 +71,7 @@ class LLMClient:
             for i in range(retries):
                 try:
                     response = await client.post(
-                        f"{self.api_url}?key={GEMINI_API_KEY}",
+                        f"{self.api_url}?key={api_key}",
                         json=payload,
                         headers=self.headers,
                         timeout=60
@@ -42,12 +82,11 @@ class LLMClient:
                 except httpx.HTTPStatusError as e:
                     if i < retries - 1 and e.response.status_code in [500, 502, 503, 504]:
                         print(f"LLM API call failed with {e.response.status_code}. Retrying in {2**(i+1)} seconds...")
+                        emit("llm.retry", attempt=i + 1, status=e.response.status_code, delay=2**(i+1))
                         await asyncio.sleep(2**(i+1)) # Exponential backoff
                     else:
                         raise # Re-raise the last exception if all retries fail or it's not a retryable error
-            
-            # Add a small delay to avoid rate limiting after a successful call
-            await asyncio.sleep(1)
+
             # Extracting the text from the nested structure
             llm_text = response_data["candidates"][0]["content"]["parts"][0]["text"]
             # Remove markdown code fences if present
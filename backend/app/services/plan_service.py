@@ -1,10 +1,29 @@
 import json
 import os
+import re
+import time
 from app.models import Plan, Graph
 from app.storage import save_plan_markdown, load_plan_markdown
-from app.config import PLANS_DIR
+from app.config import get_settings
 from app.services.llm_client import LLMClient
 from app.services.graph_service import build_graph, build_graph_with_llm, load_graph
+from app.versioning import VersionStore, text_delta, apply_text_delta, text_diff
+from app.events import publish, set_current_idea
+from app.coordination import get_coordinator, busy_error, LockTimeout, BUILD_LOCK_TIMEOUT, EDIT_LOCK_TIMEOUT
+from fastapi import HTTPException
+from typing import List, Optional
+
+plan_versions = VersionStore("plan", lambda: get_settings().plans_dir, text_delta, apply_text_delta)
+
+def _save_plan(plan: Plan, source: str):
+    """Writes the plan markdown and records it in the version history."""
+    save_plan_markdown(plan, get_settings().plans_dir)
+    version = plan_versions.record(plan.idea_id, plan.markdown, source=source)
+    publish(plan.idea_id, "plan.saved", version=version, source=source)
+
+def split_plan_sections(markdown: str) -> List[str]:
+    """Splits plan markdown into chunks at level 1-3 headings."""
+    return [chunk for chunk in re.split(r"(?m)^(?=#{1,3} )", markdown) if chunk.strip()]
 
 
 async def generate_plan(graph: Graph) -> str:
@@ -20,18 +39,70 @@ async def generate_plan(graph: Graph) -> str:
     llm_response = await llm_client.send_prompt(prompt)
     return llm_response
 
-async def get_plan(idea_id: str) -> Plan:
-    """Checks for existing plan file; if missing, invokes generate_plan()."""
-    existing_plan_markdown = load_plan_markdown(idea_id, PLANS_DIR)
-    if existing_plan_markdown:
-        return Plan(idea_id=idea_id, markdown=existing_plan_markdown)
-    
+async def load_plan(idea_id: str) -> Optional[Plan]:
+    """Returns the saved plan, or None if it hasn't been generated yet."""
+    markdown = load_plan_markdown(idea_id, get_settings().plans_dir)
+    return Plan(idea_id=idea_id, markdown=markdown) if markdown else None
+
+async def get_plan(idea_id: str, regenerate: bool = False) -> Plan:
+    """Checks for existing plan file; if missing (or regenerate is set), invokes generate_plan()."""
+    if not regenerate:
+        existing_plan = await load_plan(idea_id)
+        if existing_plan:
+            return existing_plan
+
+    # Only one worker generates a given plan; concurrent callers get its result
+    try:
+        return await get_coordinator().run_once(
+            f"plan:{idea_id}",
+            produce=lambda: _generate_and_save_plan(idea_id),
+            load_existing=lambda: load_plan(idea_id),
+            fresh_since=time.time() if regenerate else None,
+            timeout=BUILD_LOCK_TIMEOUT,
+        )
+    except LockTimeout:
+        raise busy_error(503, "The plan for this idea is still being generated. Please retry shortly.", retry_after=30)
+
+async def _generate_and_save_plan(idea_id: str) -> Plan:
+    """Generates a plan from the idea's graph (building it first if needed) and saves it."""
+    set_current_idea(idea_id)
+    publish(idea_id, "plan.started")
     graph = await load_graph(idea_id)
     if not graph:
         graph = await build_graph_with_llm(idea_id)
     
     plan_markdown = await generate_plan(graph)
+    # Sent once the whole LLM response is in (not while it is generated), split by
+    # section so subscribers other than the requester can show the plan right away.
+    sections = split_plan_sections(plan_markdown)
+    for index, section in enumerate(sections):
+        publish(idea_id, "plan.section", index=index, total=len(sections), markdown=section)
     
     plan = Plan(idea_id=idea_id, markdown=plan_markdown)
-    save_plan_markdown(plan, PLANS_DIR)
+    _save_plan(plan, source="llm")
+    publish(idea_id, "plan.done")
+    return plan
+
+def list_plan_versions(idea_id: str) -> List[dict]:
+    """Returns the plan's version history (metadata only), oldest first."""
+    return plan_versions.list_versions(idea_id)
+
+def _get_plan_version(idea_id: str, version: int) -> str:
+    markdown = plan_versions.get(idea_id, version)
+    if markdown is None:
+        raise HTTPException(status_code=404, detail=f"Plan version {version} not found.")
+    return markdown
+
+def diff_plan_versions(idea_id: str, from_version: int, to_version: int) -> List[str]:
+    """Returns a unified diff (as lines) between two plan versions."""
+    return text_diff(_get_plan_version(idea_id, from_version), _get_plan_version(idea_id, to_version))
+
+async def rollback_plan(idea_id: str, version: int) -> Plan:
+    """Restores a previous plan version locally (no LLM call); the restore is recorded as a new version."""
+    try:
+        async with get_coordinator().lock(f"plan:{idea_id}", timeout=EDIT_LOCK_TIMEOUT):
+            plan = Plan(idea_id=idea_id, markdown=_get_plan_version(idea_id, version))
+            _save_plan(plan, source=f"rollback:{version}")
+    except LockTimeout:
+        raise busy_error(409, "The plan for this idea is being generated or changed. Please retry shortly.", retry_after=2)
     return plan
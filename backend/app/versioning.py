@@ -0,0 +1,219 @@
+import difflib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+# Every Nth version is stored in full, so reconstructing any version applies at most N-1 deltas.
+SNAPSHOT_INTERVAL = 10
+
+
+def _edge_key(edge: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (edge["from_node"], edge["to_node"], edge.get("relation", ""))
+
+
+def graph_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the structural changes that turn graph `old` into graph `new`.
+
+    Nodes are matched by id, edges by (from_node, to_node, relation). Empty
+    sections are omitted to keep stored deltas small.
+    """
+    old_nodes = {n["id"]: n for n in old.get("nodes", [])}
+    new_nodes = {n["id"]: n for n in new.get("nodes", [])}
+    old_edges = {_edge_key(e) for e in old.get("edges", [])}
+    new_edges = {_edge_key(e) for e in new.get("edges", [])}
+
+    delta = {
+        "nodes_added": [n for node_id, n in new_nodes.items() if node_id not in old_nodes],
+        "nodes_removed": [node_id for node_id in old_nodes if node_id not in new_nodes],
+        "nodes_changed": [n for node_id, n in new_nodes.items() if node_id in old_nodes and old_nodes[node_id] != n],
+        "edges_added": [e for e in new.get("edges", []) if _edge_key(e) not in old_edges],
+        "edges_removed": [e for e in old.get("edges", []) if _edge_key(e) not in new_edges],
+    }
+    return {key: value for key, value in delta.items() if value}
+
+
+def apply_graph_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Applies a delta produced by graph_delta() and returns the new graph."""
+    removed = set(delta.get("nodes_removed", []))
+    changed = {n["id"]: n for n in delta.get("nodes_changed", [])}
+    nodes = [changed.get(n["id"], n) for n in base.get("nodes", []) if n["id"] not in removed]
+    nodes.extend(delta.get("nodes_added", []))
+
+    removed_edges = {_edge_key(e) for e in delta.get("edges_removed", [])}
+    edges = [e for e in base.get("edges", []) if _edge_key(e) not in removed_edges]
+    edges.extend(delta.get("edges_added", []))
+    return {"nodes": nodes, "edges": edges}
+
+
+def text_delta(old: str, new: str) -> Dict[str, Any]:
+    """Returns line-level replace operations ([start, end, new_lines]) that turn `old` into `new`."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+    return {"ops": ops}
+
+
+def apply_text_delta(base: str, delta: Dict[str, Any]) -> str:
+    """Applies a delta produced by text_delta()."""
+    lines = base.splitlines(keepends=True)
+    # Apply back to front so earlier line offsets stay valid
+    for start, end, replacement in reversed(delta["ops"]):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+def graph_diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Human-facing graph diff: same shape as graph_delta() but with every section present."""
+    delta = graph_delta(old, new)
+    return {key: delta.get(key, []) for key in ("nodes_added", "nodes_removed", "nodes_changed", "edges_added", "edges_removed")}
+
+
+def text_diff(old: str, new: str) -> List[str]:
+    """Human-facing text diff as unified diff lines."""
+    return list(difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm=""))
+
+
+class VersionStore:
+    """Append-only revision history per idea, stored as deltas with periodic snapshots.
+
+    History lives in {directory}/{idea_id}_{kind}_versions.jsonl, one entry per
+    line; `directory` may be a callable so it can be resolved from settings on
+    first use. Recording a version appends a single line, so a crash mid-write
+    can only lose that line, never earlier history. Version numbers start at 1
+    and never get reused; a rollback records the restored content as a new
+    version rather than truncating history.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        directory: Union[str, Callable[[], str]],
+        make_delta: Callable[[Any, Any], Dict[str, Any]],
+        apply_delta: Callable[[Any, Dict[str, Any]], Any],
+        snapshot_interval: int = SNAPSHOT_INTERVAL,
+    ):
+        self.kind = kind
+        self.directory = directory
+        self.make_delta = make_delta
+        self.apply_delta = apply_delta
+        self.snapshot_interval = snapshot_interval
+
+    def _directory(self) -> str:
+        return self.directory() if callable(self.directory) else self.directory
+
+    def _path(self, idea_id: str) -> str:
+        return os.path.join(self._directory(), f"{idea_id}_{self.kind}_versions.jsonl")
+
+    def _migrate_legacy(self, idea_id: str):
+        """Converts a whole-file {idea_id}_{kind}_versions.json history to JSON lines."""
+        legacy_path = os.path.join(self._directory(), f"{idea_id}_{self.kind}_versions.json")
+        if not os.path.exists(legacy_path):
+            return
+        with open(legacy_path, "r") as f:
+            entries = json.load(f)["versions"]
+        tmp_path = f"{self._path(idea_id)}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        os.replace(tmp_path, self._path(idea_id))
+        os.remove(legacy_path)
+
+    def _load(self, idea_id: str) -> List[Dict[str, Any]]:
+        path = self._path(idea_id)
+        if not os.path.exists(path):
+            self._migrate_legacy(idea_id)
+            if not os.path.exists(path):
+                return []
+        entries = []
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Only the last line can be torn (a crash mid-append); it never completed
+                    print(f"WARNING: Ignoring incomplete version entry in {path}")
+                    break
+        return entries
+
+    def _append(self, idea_id: str, entry: Dict[str, Any]):
+        os.makedirs(self._directory(), exist_ok=True)
+        path = self._path(idea_id)
+        line = json.dumps(entry) + "\n"
+        with open(path, "rb+" if os.path.exists(path) else "wb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() and not self._ends_with_newline(f):
+                # Cut off a torn line left by an earlier crash; complete lines are never rewritten
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+                f.seek(0, os.SEEK_END)
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _ends_with_newline(f) -> bool:
+        f.seek(-1, os.SEEK_END)
+        ends = f.read(1) == b"\n"
+        f.seek(0, os.SEEK_END)
+        return ends
+
+    def _reconstruct(self, entries: List[Dict[str, Any]], index: int) -> Any:
+        start = index
+        while entries[start]["kind"] != "snapshot":
+            start -= 1
+        content = entries[start]["data"]
+        for entry in entries[start + 1:index + 1]:
+            content = self.apply_delta(content, entry["data"])
+        return content
+
+    def record(self, idea_id: str, content: Any, source: str = "") -> int:
+        """Stores content as the next version and returns its number.
+
+        Content identical to the latest version is not stored again; the latest
+        version number is returned instead.
+        """
+        entries = self._load(idea_id)
+        version = len(entries) + 1
+        entry = {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+            "kind": "snapshot",
+            "data": content,
+        }
+        if entries:
+            previous = self._reconstruct(entries, len(entries) - 1)
+            if previous == content:
+                return entries[-1]["version"]
+            if (version - 1) % self.snapshot_interval != 0:
+                delta = self.make_delta(previous, content)
+                # Only keep the delta if it reproduces the content exactly (e.g. not
+                # just a reordering) and is actually smaller than a snapshot.
+                if self.apply_delta(previous, delta) == content and len(json.dumps(delta)) < len(json.dumps(content)):
+                    entry["kind"] = "delta"
+                    entry["data"] = delta
+        self._append(idea_id, entry)
+        return version
+
+    def list_versions(self, idea_id: str) -> List[Dict[str, Any]]:
+        """Returns version metadata (without content), oldest first."""
+        return [
+            {key: entry[key] for key in ("version", "created_at", "source", "kind")}
+            for entry in self._load(idea_id)
+        ]
+
+    def latest_version(self, idea_id: str) -> int:
+        """Returns the latest version number, or 0 when there is no history."""
+        return len(self._load(idea_id))
+
+    def get(self, idea_id: str, version: int) -> Union[Any, None]:
+        """Reconstructs the content of a version, or returns None if it doesn't exist."""
+        entries = self._load(idea_id)
+        if version < 1 or version > len(entries):
+            return None
+        return self._reconstruct(entries, version - 1)
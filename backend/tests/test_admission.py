@@ -0,0 +1,216 @@
+import asyncio
+import os
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.admission import AdaptiveLimit, AdmissionController, OperationPolicy, report_llm_failure, set_admission_controller
+from app.config import IDEAS_DIR
+from app.main import app
+from app.models import Idea
+from app.storage import save_idea
+
+OPERATIONS = {
+    "graph_edit": OperationPolicy(priority=0, max_concurrency=2),
+    "plan": OperationPolicy(priority=2, max_concurrency=1),
+}
+
+
+def _controller(max_concurrency=2, max_queue_depth=8, max_wait=5.0):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        max_queue_depth=max_queue_depth,
+        target_latency=1.0,
+        max_wait=max_wait,
+        operations=OPERATIONS,
+    )
+
+
+async def _hold(controller, operation, release, started=None, order=None):
+    async with controller.slot(operation):
+        if order is not None:
+            order.append(operation)
+        if started is not None:
+            started.set()
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_per_operation_cap_and_global_limit():
+    controller = _controller(max_concurrency=2)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(_hold(controller, "plan", release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # Plan is capped at one slot even though the global limit is two
+    assert controller.stats()["active_by_operation"]["plan"] == 1
+    assert controller.stats()["queued"] == 1
+
+    # A graph edit still gets the free global slot
+    edit = asyncio.create_task(_hold(controller, "graph_edit", release))
+    await asyncio.sleep(0)
+    assert controller.stats()["active"] == 2
+
+    release.set()
+    await asyncio.gather(*tasks, edit)
+    assert controller.stats()["active"] == 0
+    assert controller.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_edits_are_admitted_before_plans():
+    controller = _controller(max_concurrency=1)
+    first_release, release = asyncio.Event(), asyncio.Event()
+    order = []
+    running = asyncio.create_task(_hold(controller, "graph_edit", first_release))
+    await asyncio.sleep(0)
+    plan = asyncio.create_task(_hold(controller, "plan", release, order=order))
+    await asyncio.sleep(0)
+    edit = asyncio.create_task(_hold(controller, "graph_edit", release, order=order))
+    await asyncio.sleep(0)
+
+    first_release.set()
+    release.set()
+    await asyncio.gather(running, plan, edit)
+    assert order == ["graph_edit", "plan"]
+
+
+@pytest.mark.asyncio
+async def test_sheds_low_priority_first_with_retry_after():
+    controller = _controller(max_concurrency=1, max_queue_depth=4)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(controller, "graph_edit", release))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(_hold(controller, "graph_edit", release)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Plans are shed once the queue is half full; edits may still queue
+    with pytest.raises(HTTPException) as exc:
+        await controller.acquire("plan")
+    assert exc.value.status_code == 503
+    assert int(exc.value.headers["Retry-After"]) >= 1
+    waiting.append(asyncio.create_task(_hold(controller, "graph_edit", release)))
+    await asyncio.sleep(0)
+    assert controller.stats()["queued"] == 3
+    assert controller.stats()["shed"] == 1
+
+    release.set()
+    await asyncio.gather(running, *waiting)
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout_and_cancellation_free_the_queue():
+    controller = _controller(max_concurrency=1, max_wait=0.05)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(controller, "graph_edit", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc:
+        await controller.acquire("plan")
+    assert exc.value.status_code == 503
+
+    cancelled = asyncio.create_task(controller.acquire("plan"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert controller.stats()["queued"] == 0
+
+    release.set()
+    await running
+    assert controller.stats()["active"] == 0
+
+
+def test_adaptive_limit_aimd():
+    limit = AdaptiveLimit(initial=4, minimum=1, maximum=8, target_latency=1.0, cooldown=0)
+    for _ in range(4):
+        limit.on_result(0.1, ok=True)
+    assert limit.current == 4  # Roughly +1 per limit's worth of fast calls
+    limit.on_result(0.1, ok=True)
+    assert limit.current == 5
+
+    limit.on_result(0.1, ok=False)
+    assert limit.current == 2
+    limit.on_result(5.0, ok=True)  # Too slow counts against the limit too
+    assert limit.current == 1
+    limit.on_result(5.0, ok=True)
+    assert limit.current == 1
+
+
+def test_adaptive_limit_decreases_once_per_cooldown():
+    limit = AdaptiveLimit(initial=8, minimum=1, maximum=8, target_latency=1.0, cooldown=60)
+    # A burst of failures from calls already in flight only halves the limit once
+    for _ in range(5):
+        limit.on_result(0.1, ok=False)
+    assert limit.current == 4
+
+
+@pytest.mark.asyncio
+async def test_slot_records_errors_but_not_client_errors():
+    controller = _controller(max_concurrency=4)
+    controller.limit.cooldown = 0
+    with pytest.raises(HTTPException):
+        async with controller.slot("graph_edit"):
+            raise HTTPException(status_code=404, detail="Idea not found")
+    assert controller.limit.current == 4
+    with pytest.raises(HTTPException):
+        async with controller.slot("graph_edit"):
+            raise HTTPException(status_code=503, detail="Still building", headers={"Retry-After": "30"})
+    assert controller.limit.current == 4
+
+    with pytest.raises(RuntimeError):
+        async with controller.slot("graph_edit"):
+            raise RuntimeError("LLM failed")
+    assert controller.limit.current == 2
+    assert controller.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reported_llm_failure_counts_against_the_limit():
+    controller = _controller(max_concurrency=4)
+    controller.limit.cooldown = 0
+    async with controller.slot("graph_edit"):
+        report_llm_failure()
+    assert controller.limit.current == 2
+    async with controller.slot("graph_edit"):
+        pass
+    assert controller.limit.current == 2  # The flag doesn't leak into the next slot
+    report_llm_failure()  # Outside a slot: no effect
+
+
+def test_graph_fallback_lowers_the_limit():
+    controller = AdmissionController(max_concurrency=4, max_queue_depth=8, target_latency=10.0, max_wait=5.0)
+    controller.limit.cooldown = 0
+    set_admission_controller(controller)
+    idea_id = "test_admission_fallback_idea"
+    save_idea(Idea(id=idea_id, text="A recipe app", answers={}), IDEAS_DIR)
+    request = httpx.Request("POST", "https://example.invalid")
+    error = httpx.HTTPStatusError("rate limited", request=request, response=httpx.Response(429, request=request))
+    try:
+        with patch('app.services.llm_client.LLMClient.send_prompt', side_effect=error):
+            for _ in range(2):
+                # Each request gets the draft and retries the LLM, which is still rate limited
+                assert TestClient(app).get(f"/ideas/{idea_id}/graph").status_code == 200
+        assert controller.limit.current == 1
+    finally:
+        set_admission_controller(None)
+        for name in (f"{idea_id}.json", f"{idea_id}_graph.json", f"{idea_id}_graph_versions.jsonl"):
+            path = os.path.join(IDEAS_DIR, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_overloaded_route_returns_503_with_retry_after():
+    controller = _controller(max_concurrency=1, max_queue_depth=1)
+    controller._active_total = 1  # Simulate a busy worker
+    controller._active["graph_edit"] = 1
+    controller._queues[0] = [object()]
+    set_admission_controller(controller)
+    try:
+        with patch('app.main.edit_graph_with_llm') as mock_edit:
+            response = TestClient(app).post("/ideas/test_idea_id/graph/edit", json={"user_text_input": "Add a node"})
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
+        mock_edit.assert_not_called()
+    finally:
+        set_admission_controller(None)
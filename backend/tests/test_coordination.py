@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.coordination import InMemoryCoordinator, RedisCoordinator, LockTimeout, create_coordinator, set_coordinator
+from app.models import Idea
+from app.storage import save_idea
+from app.config import IDEAS_DIR
+from app.services.graph_service import build_graph_with_llm, edit_graph_with_llm, rollback_graph
+from fastapi import HTTPException
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _redis_workers(count):
+    """Coordinators for `count` workers sharing one fake Redis server."""
+    server = fakeredis.FakeServer()
+    return [RedisCoordinator(fakeredis.FakeAsyncRedis(server=server, decode_responses=True)) for _ in range(count)]
+
+
+def _memory_workers(count):
+    # In-process coordination is only shared within one process, i.e. one instance
+    coordinator = InMemoryCoordinator()
+    return [coordinator] * count
+
+
+@pytest.fixture(params=["memory", "redis"])
+def workers(request):
+    return _memory_workers if request.param == "memory" else _redis_workers
+
+
+@pytest.mark.asyncio
+async def test_lock_is_exclusive(workers):
+    first, second = workers(2)
+    async with first.lock("resource", timeout=1):
+        with pytest.raises(LockTimeout):
+            async with second.lock("resource", timeout=0.1):
+                pass
+    async with second.lock("resource", timeout=1):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_lock_expires_when_holder_dies(workers):
+    first, second = workers(2)
+    assert await first._acquire("resource", "dead-worker", ttl=0.05)
+    async with second.lock("resource", timeout=1):
+        # The expired holder can no longer release a lock it doesn't own
+        assert not await first._release("resource", "dead-worker")
+
+
+@pytest.mark.asyncio
+async def test_cache_roundtrip_and_ttl(workers):
+    first, second = workers(2)
+    await first.cache_set("key", "value")
+    assert await second.cache_get("key") == "value"
+    await second.cache_delete("key")
+    assert await first.cache_get("key") is None
+
+    await first.cache_set("short", "lived", ttl=0.05)
+    await asyncio.sleep(0.1)
+    assert await second.cache_get("short") is None
+
+
+@pytest.mark.asyncio
+async def test_run_once_across_workers(workers):
+    coordinators = workers(5)
+    produced = []
+    store = {}
+
+    async def produce():
+        produced.append(1)
+        await asyncio.sleep(0.1)
+        store["result"] = "graph"
+        return "graph"
+
+    async def load_existing():
+        return store.get("result")
+
+    started = time.time()
+    results = await asyncio.gather(*[
+        c.run_once("graph:idea", produce, load_existing, fresh_since=started) for c in coordinators
+    ])
+    assert results == ["graph"] * 5
+    assert len(produced) == 1
+    job = await coordinators[0].get_job("graph:idea")
+    assert job["state"] == "done"
+
+    # A later explicit rebuild runs again
+    await coordinators[1].run_once("graph:idea", produce, load_existing, fresh_since=time.time())
+    assert len(produced) == 2
+
+
+@pytest.mark.asyncio
+async def test_run_once_records_failures(workers):
+    coordinator = workers(1)[0]
+
+    async def produce():
+        raise RuntimeError("LLM down")
+
+    async def load_existing():
+        return None
+
+    with pytest.raises(RuntimeError):
+        await coordinator.run_once("plan:idea", produce, load_existing)
+    job = await coordinator.get_job("plan:idea")
+    assert job["state"] == "failed"
+    assert job["error"] == "LLM down"
+
+
+def test_create_coordinator():
+    assert isinstance(create_coordinator(""), InMemoryCoordinator)
+    assert isinstance(create_coordinator("memory://"), InMemoryCoordinator)
+    with pytest.raises(ValueError):
+        create_coordinator("zookeeper://localhost")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_graph_builds_call_llm_once():
+    idea_id = "test_coordination_graph_idea"
+    save_idea(Idea(id=idea_id, text="A recipe app", answers={}), IDEAS_DIR)
+    llm_graph = json.dumps({"nodes": [{"id": "1", "label": "Recipe app", "type": "idea"}], "edges": []})
+
+    async def slow_send_prompt(self, prompt):
+        await asyncio.sleep(0.1)
+        return llm_graph
+
+    coordinator = _redis_workers(1)[0]
+    set_coordinator(coordinator)
+    try:
+        with patch('app.services.llm_client.LLMClient.send_prompt', autospec=True, side_effect=slow_send_prompt) as mock_send_prompt:
+            graphs = await asyncio.gather(*[build_graph_with_llm(idea_id) for _ in range(4)])
+            assert mock_send_prompt.call_count == 1
+            assert all(graph == graphs[0] for graph in graphs)
+
+            # Concurrent rebuild requests share one build too
+            await asyncio.gather(*[build_graph_with_llm(idea_id, regenerate=True) for _ in range(4)])
+            assert mock_send_prompt.call_count == 2
+
+            # Without regenerate the saved graph is used, whatever clock the last job was stamped with
+            await coordinator.set_job("graph:" + idea_id, "done", finished_at=0)
+            assert await build_graph_with_llm(idea_id) == graphs[0]
+            assert mock_send_prompt.call_count == 2
+    finally:
+        set_coordinator(None)
+        _remove_idea_files(idea_id)
+
+
+def _remove_idea_files(idea_id):
+    for name in (f"{idea_id}.json", f"{idea_id}_graph.json", f"{idea_id}_graph_versions.jsonl"):
+        path = os.path.join(IDEAS_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.mark.asyncio
+async def test_edits_give_up_quickly_while_the_graph_is_locked():
+    idea_id = "test_coordination_locked_idea"
+    coordinator = InMemoryCoordinator()
+    set_coordinator(coordinator)
+    try:
+        async with coordinator.lock(f"graph:{idea_id}"):
+            with patch('app.services.graph_service.EDIT_LOCK_TIMEOUT', 0.05), \
+                 patch('app.services.llm_client.LLMClient.send_prompt') as mock_send_prompt:
+                with pytest.raises(HTTPException) as edit_error:
+                    await edit_graph_with_llm(idea_id, "Add a node")
+                with pytest.raises(HTTPException) as rollback_error:
+                    await rollback_graph(idea_id, 1)
+            with patch('app.services.graph_service.BUILD_LOCK_TIMEOUT', 0.05):
+                with pytest.raises(HTTPException) as build_error:
+                    await build_graph_with_llm(idea_id)
+        assert edit_error.value.status_code == 409
+        assert rollback_error.value.status_code == 409
+        assert edit_error.value.headers["Retry-After"] == "2"
+        assert build_error.value.status_code == 503
+        assert "Retry-After" in build_error.value.headers
+        mock_send_prompt.assert_not_called()
+    finally:
+        set_coordinator(None)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from app.events import EventBus, event_bus, emit, set_current_idea, format_sse
+from app.models import Graph, Node
+from app.services.plan_service import get_plan
+
+@pytest.mark.asyncio
+async def test_publish_reaches_subscribers_of_that_idea_only():
+    bus = EventBus()
+    subscription = bus.subscribe("idea-1")
+    other = bus.subscribe("idea-2")
+    bus.publish("idea-1", "graph.parsed", nodes=3)
+
+    message = await subscription.get(timeout=1)
+    assert message["event"] == "graph.parsed"
+    assert message["data"] == {"nodes": 3}
+    assert other.queue.empty()
+
+    subscription.close()
+    other.close()
+    assert bus.subscriber_count("idea-1") == 0
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_oldest_and_is_told():
+    bus = EventBus(buffer_size=3)
+    subscription = bus.subscribe("idea")
+    for i in range(5):
+        bus.publish("idea", "plan.section", index=i)
+
+    dropped = await subscription.get(timeout=1)
+    assert dropped["event"] == "events.dropped"
+    assert dropped["data"] == {"count": 2}
+    indexes = [(await subscription.get(timeout=1))["data"]["index"] for _ in range(3)]
+    assert indexes == [2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_get_times_out_when_idle():
+    subscription = EventBus().subscribe("idea")
+    with pytest.raises(asyncio.TimeoutError):
+        await subscription.get(timeout=0.01)
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_missed_events():
+    bus = EventBus(history_size=10)
+    first = bus.publish("idea", "graph.started")
+    bus.publish("idea", "graph.parsed")
+    bus.publish("idea", "graph.saved")
+
+    subscription = bus.subscribe("idea", last_event_id=first["id"])
+    events = [(await subscription.get(timeout=1))["event"] for _ in range(2)]
+    assert events == ["graph.parsed", "graph.saved"]
+
+@pytest.mark.asyncio
+async def test_reconnect_with_id_from_another_worker_resets():
+    worker_a, worker_b = EventBus(), EventBus()
+    seen_on_a = worker_a.publish("idea", "graph.started")
+    worker_b.publish("idea", "graph.started")
+    worker_b.publish("idea", "graph.saved")
+
+    # Sequence numbers overlap across workers; B must not replay its own events after A's id
+    subscription = worker_b.subscribe("idea", last_event_id=seen_on_a["id"])
+    assert (await subscription.get(timeout=1))["event"] == "events.reset"
+    assert subscription.queue.empty()
+
+@pytest.mark.asyncio
+async def test_emit_uses_current_idea():
+    async def in_request(idea_id):
+        set_current_idea(idea_id)
+        emit("llm.retry", attempt=1)
+
+    await asyncio.create_task(in_request("emit-idea"))
+    assert event_bus.history("emit-idea")[-1]["event"] == "llm.retry"
+
+def test_format_sse():
+    frame = format_sse({"id": "ab12cd34-7", "seq": 7, "event": "plan.section", "data": {"index": 0}, "ts": 1.5})
+    assert frame.startswith("id: ab12cd34-7\nevent: plan.section\ndata: ")
+    assert frame.endswith("\n\n")
+    assert json.loads(frame.split("data: ", 1)[1]) == {"data": {"index": 0}, "ts": 1.5}
+
+@pytest.mark.asyncio
+async def test_get_plan_publishes_progress(tmp_path):
+    idea_id = "events_plan_idea"
+    mock_graph = Graph(nodes=[Node(id=idea_id, label="Idea", type="idea")], edges=[])
+    markdown = "# Plan\nIntro\n## Phase 1\n- Design\n## Phase 2\n- Build\n"
+
+    with patch('app.services.plan_service.load_plan_markdown', return_value=None), \
+         patch('app.services.plan_service.load_graph', return_value=mock_graph), \
+         patch('app.services.plan_service.generate_plan', return_value=markdown), \
+         patch('app.services.plan_service.save_plan_markdown'), \
+         patch('app.services.plan_service.plan_versions.directory', str(tmp_path)):
+        await get_plan(idea_id)
+
+    history = event_bus.history(idea_id)
+    assert [m["event"] for m in history] == ["plan.started", "plan.section", "plan.section", "plan.section", "plan.saved", "plan.done"]
+    chunks = [m["data"]["markdown"] for m in history if m["event"] == "plan.section"]
+    assert "".join(chunks) == markdown
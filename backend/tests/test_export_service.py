@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+import os
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import Plan, Graph, Node, Edge
+from app.storage import save_plan_markdown
+from app.config import PLANS_DIR, IDEAS_DIR
+from app.services import export_service
+from app.services.export_service import export_plan, get_plan_ast, link_dependencies, parse_plan
+
+PLAN_MARKDOWN = """# Development Plan: Recipe App
+
+This plan covers the MVP.
+
+## Phase 1: Foundations
+
+Set up the basics.
+
+1. **Set up the backend:** create the FastAPI project.
+   - Add CI
+2. **Recipe database:** design the schema.
+
+## Phase 2: Features
+
+### Recipe search
+Search uses the recipe database.
+
+### Meal planner
+Weekly planner, built on recipe search.
+"""
+
+GRAPH = Graph(
+    nodes=[
+        Node(id="idea", label="Recipe App", type="idea"),
+        Node(id="search", label="Recipe search"),
+        Node(id="db", label="Recipe database", type="technology"),
+        Node(id="planner", label="Meal planner"),
+    ],
+    edges=[
+        Edge(from_node="idea", to_node="search", relation="has feature"),
+        Edge(from_node="search", to_node="db", relation="depends on"),
+        Edge(from_node="search", to_node="planner", relation="enables"),
+    ],
+)
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.makedirs(PLANS_DIR, exist_ok=True)
+    os.makedirs(IDEAS_DIR, exist_ok=True)
+    export_service._ast_cache.clear()
+    yield
+    for d in [PLANS_DIR, IDEAS_DIR]:
+        for f in os.listdir(d):
+            if f.endswith((".json", ".jsonl", ".md")):
+                os.remove(os.path.join(d, f))
+
+
+def _save(idea_id="export_idea", graph=GRAPH):
+    save_plan_markdown(Plan(idea_id=idea_id, markdown=PLAN_MARKDOWN), PLANS_DIR)
+    if graph is not None:
+        with open(os.path.join(IDEAS_DIR, f"{idea_id}_graph.json"), "w") as f:
+            json.dump(graph.model_dump(), f)
+
+
+def test_parse_plan_phases_and_tasks():
+    document = parse_plan(PLAN_MARKDOWN)
+    assert document.title == "Development Plan: Recipe App"
+    assert document.intro == "This plan covers the MVP."
+    assert [phase.title for phase in document.phases] == ["Phase 1: Foundations", "Phase 2: Features"]
+    assert document.phases[0].description == "Set up the basics."
+    first, second = document.phases[0].tasks
+    assert (first.id, first.title) == ("1.1", "Set up the backend")
+    assert first.description == "create the FastAPI project.\n- Add CI"
+    assert (second.id, second.title) == ("1.2", "Recipe database")
+    assert [task.title for task in document.phases[1].tasks] == ["Recipe search", "Meal planner"]
+
+
+def test_parse_plan_without_headings():
+    document = parse_plan("- Design\n- Build\n  with tests\n- Ship")
+    assert len(document.phases) == 1
+    assert [task.title for task in document.phases[0].tasks] == ["Design", "Build", "Ship"]
+    assert document.phases[0].tasks[1].description == "with tests"
+
+
+def test_parse_plan_ignores_headings_in_code_fences():
+    markdown = (
+        "# Plan: Recipe App\n## Phase 1: Setup\n1. **Create project**\n"
+        "```bash\n# install dependencies\npip install fastapi\n```\n"
+        "2. **Database schema**\n~~~\n## not a phase\n~~~\n## Phase 2: Features\n"
+    )
+    document = parse_plan(markdown)
+    assert document.title == "Plan: Recipe App"
+    assert [phase.title for phase in document.phases] == ["Phase 1: Setup", "Phase 2: Features"]
+    first, second = document.phases[0].tasks
+    assert first.title == "Create project"
+    assert first.description == "```bash\n# install dependencies\npip install fastapi\n```"
+    assert second.description == "~~~\n## not a phase\n~~~"
+
+
+def test_dependencies_come_from_graph():
+    links = link_dependencies(parse_plan(PLAN_MARKDOWN), GRAPH)
+    assert links["2.1"] == (["search", "db"], ["1.2"])  # Search depends on the database
+    assert links["2.2"][1] == ["2.1"]  # Search enables the planner
+    assert links["1.1"] == ([], [])
+    # The idea node and non-dependency relations are ignored
+    assert all("idea" not in node_ids for node_ids, _ in links.values())
+
+    no_graph = link_dependencies(parse_plan(PLAN_MARKDOWN), None)
+    assert all(depends_on == [] for _, depends_on in no_graph.values())
+
+
+def test_plan_ast_is_cached_by_content():
+    with patch('app.services.export_service.parse_plan', wraps=parse_plan) as mock_parse:
+        first = get_plan_ast(PLAN_MARKDOWN)
+        assert get_plan_ast(PLAN_MARKDOWN) is first
+        get_plan_ast(PLAN_MARKDOWN + "\n## Phase 3: Launch\n")
+    assert mock_parse.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_export_formats():
+    _save()
+    chunks, media_type, filename = await export_plan("export_idea", "json")
+    exported = json.loads("".join(chunks))
+    assert media_type == "application/json"
+    assert filename == "export_idea_plan.json"
+    assert exported["phases"][1]["tasks"][0]["depends_on"] == ["1.2"]
+
+    chunks, _, _ = await export_plan("export_idea", "csv")
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert [row["task_id"] for row in rows] == ["1.1", "1.2", "2.1", "2.2"]
+    assert rows[3]["depends_on"] == "2.1"
+
+    chunks, media_type, _ = await export_plan("export_idea", "html")
+    page = "".join(chunks)
+    assert media_type.startswith("text/html")
+    assert '<li id="task-2.1">' in page
+    assert '<a href="#task-1.2">Recipe database</a>' in page
+
+
+@pytest.mark.asyncio
+async def test_export_missing_plan_never_calls_llm():
+    with patch('app.services.llm_client.LLMClient.send_prompt') as mock_send_prompt:
+        with pytest.raises(HTTPException) as exc:
+            await export_plan("missing_idea", "json")
+    assert exc.value.status_code == 404
+    mock_send_prompt.assert_not_called()
+
+
+def test_export_endpoint():
+    _save(graph=None)
+    client = TestClient(app)
+    response = client.get("/ideas/export_idea/plan/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="export_idea_plan.csv"' in response.headers["content-disposition"]
+    assert response.text.splitlines()[0] == "task_id,phase,title,description,depends_on,graph_nodes"
+
+    assert client.get("/ideas/export_idea/plan/export", params={"format": "pdf"}).status_code == 422
+    assert client.get("/ideas/missing_idea/plan/export").status_code == 404
@@ -0,0 +1,58 @@
+import time
+from app.services.extraction_service import extract, extract_graph, normalize_phrase
+from app.models import Idea
+
+def test_extract_phrases():
+    extraction = extract("Users can share photos, comments and short videos with friends.")
+    assert [p.label for p in extraction.phrases] == ["Users", "share photos", "comments", "short videos", "friends"]
+
+def test_extract_cue_relations():
+    extraction = extract(
+        "The checkout service requires a payment gateway. "
+        "The dashboard is built with React. Reports are generated after the nightly import."
+    )
+    assert ("checkout service", "payment gateway", "depends on") in extraction.relations
+    assert ("dashboard", "react", "is built with") in extraction.relations
+    assert ("report", "nightly import", "follows") in extraction.relations
+
+def test_extract_relations_do_not_cross_sentences():
+    extraction = extract("We need a mobile app. Requires nothing else.")
+    assert extraction.relations == []
+
+def test_extract_negated_cues_add_no_relation():
+    extraction = extract("The app doesn't need a login. The API does not require accounts. Search won’t use Elasticsearch.")
+    assert extraction.relations == []
+    assert [p.label for p in extraction.phrases] == ["app", "login", "API", "accounts", "Search", "Elasticsearch"]
+
+def test_normalize_phrase_folds_case_and_plurals():
+    assert normalize_phrase(["User", "Stories"]) == normalize_phrase(["user", "story"])
+    assert normalize_phrase(["Access"]) == "access"
+
+def test_extract_graph_dedupes_entities():
+    idea = Idea(id="dedupe", text="A booking platform for yoga studios", answers={
+        "Who are the users?": "Yoga studios and their members",
+        "What are the core features?": "Class booking for members, payments via Stripe",
+    })
+    graph = extract_graph(idea)
+    labels = [node.label.lower() for node in graph.nodes]
+    assert labels.count("yoga studios") == 1
+    assert labels.count("members") == 1
+    studio = next(node for node in graph.nodes if node.label.lower() == "yoga studios")
+    assert studio.priority == 2 # Mentioned in the idea and in one answer
+    assert len({node.id for node in graph.nodes}) == len(graph.nodes)
+    # Deterministic: same input, same ids
+    assert [node.id for node in extract_graph(idea).nodes] == [node.id for node in graph.nodes]
+
+def test_extract_graph_throughput():
+    idea = Idea(id="throughput", text="Develop a marketplace app for local farmers", answers={
+        "Who is the target audience?": "Local farmers and urban families who buy fresh produce",
+        "What are the core features?": "Product listings, ordering, delivery scheduling. Ordering requires user accounts.",
+        "What technology will be used?": "Mobile app built with Flutter, backend uses PostgreSQL",
+    })
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        extract_graph(idea)
+    elapsed = time.perf_counter() - start
+    # Generous bound so slow CI machines pass; typically well over 1000 ideas/s
+    assert runs / elapsed > 200
@@ -2,7 +2,11 @@ import pytest
 import os
 import json
 from unittest.mock import patch, MagicMock
-from app.services.graph_service import build_graph
+import httpx
+from app.services.graph_service import (
+    build_graph, build_graph_with_llm, edit_graph_with_llm, load_graph,
+    list_graph_versions, diff_graph_versions, rollback_graph,
+)
 from app.models import Idea, Node, Edge, Graph
 from app.storage import save_idea, load_idea
 from app.config import IDEAS_DIR
@@ -13,7 +17,7 @@ def setup_teardown():
     os.makedirs(IDEAS_DIR, exist_ok=True)
     yield
     for f in os.listdir(IDEAS_DIR):
-        if f.endswith(".json"):
+        if f.endswith((".json", ".jsonl")):
             os.remove(os.path.join(IDEAS_DIR, f))
 
 @pytest.mark.asyncio
@@ -22,7 +26,7 @@ async def test_build_graph():
     idea_text = "Develop a new social media platform."
     answers = {
         "What is the target audience?": "Young adults (18-30)",
-        "What are the core features?": "Feed, messaging, groups, events",
+        "What are the core features?": "Feed, messaging, groups, events. Messaging requires user accounts.",
         "What is the monetization strategy?": "Ads and premium subscriptions"
     }
     idea = Idea(id=idea_id, text=idea_text, answers=answers)
@@ -31,8 +35,6 @@ async def test_build_graph():
     graph = await build_graph(idea_id)
 
     assert isinstance(graph, Graph)
-    assert len(graph.nodes) == 1 + len(answers) # Main idea + each answer as a node
-    assert len(graph.edges) == len(answers) # Each answer linked to main idea
 
     # Verify main idea node
     main_idea_node = next((node for node in graph.nodes if node.id == idea_id), None)
@@ -40,25 +42,31 @@ async def test_build_graph():
     assert main_idea_node.label == idea_text
     assert main_idea_node.type == "idea"
 
-    # Verify answer nodes and edges
-    for question, answer in answers.items():
-        answer_node = next((node for node in graph.nodes if node.label == answer), None)
-        assert answer_node is not None
-        assert answer_node.type == "feature"
-        assert answer_node.notes == question
-
-        edge = next((e for e in graph.edges if e.from_node == idea_id and e.to_node == answer_node.id), None)
+    # Key phrases become nodes, typed and linked according to the question they answer
+    by_label = {node.label: node for node in graph.nodes}
+    expected = {
+        "social media platform": ("feature", "has feature"),
+        "Young adults": ("user", "targets"),
+        "Feed": ("feature", "has feature"),
+        "messaging": ("feature", "has feature"),
+        "user accounts": ("feature", "has feature"),
+        "Ads": ("business", "is monetized by"),
+        "premium subscriptions": ("business", "is monetized by"),
+    }
+    for label, (node_type, relation) in expected.items():
+        assert label in by_label, label
+        assert by_label[label].type == node_type
+        edge = next((e for e in graph.edges if e.from_node == idea_id and e.to_node == by_label[label].id), None)
         assert edge is not None
-        # The relation depends on the order of answers and the relation_types list in graph_service.py
-        # For the first answer (idx=0), it should be "is defined by"
-        # For the second answer (idx=1), it should be "depends on"
-        # For the third answer (idx=2), it should be "leads to"
-        expected_relations = {
-            "What is the target audience?": "is defined by",
-            "What are the core features?": "depends on",
-            "What is the monetization strategy?": "leads to"
-        }
-        assert edge.relation == expected_relations[question]
+        assert edge.relation == relation
+
+    # Cue phrases produce typed edges between entities
+    dependency = next((e for e in graph.edges if e.from_node == by_label["messaging"].id and e.to_node == by_label["user accounts"].id), None)
+    assert dependency is not None
+    assert dependency.relation == "depends on"
+
+    # "Messaging" and "messaging" are the same entity
+    assert sum(1 for node in graph.nodes if node.label.lower() == "messaging") == 1
 
     # Verify graph file was saved
     graph_file_path = os.path.join(IDEAS_DIR, f"{idea_id}_graph.json")
@@ -83,9 +91,76 @@ async def test_build_graph_no_answers():
 
     graph = await build_graph(idea_id)
     assert isinstance(graph, Graph)
-    assert len(graph.nodes) == 1 # Only the main idea node
-    assert len(graph.edges) == 0
+    # Only the main idea node plus phrases from the idea text itself
+    assert graph.nodes[0].id == idea_id
+    assert graph.nodes[0].label == idea_text
+    assert all(node.notes == "From idea description" for node in graph.nodes[1:])
+    assert all(edge.from_node == idea_id for edge in graph.edges)
+    assert len(graph.edges) == len(graph.nodes) - 1
 
-    main_idea_node = next((node for node in graph.nodes if node.id == idea_id), None)
-    assert main_idea_node is not None
-    assert main_idea_node.label == idea_text
+@pytest.mark.asyncio
+async def test_build_graph_with_llm_falls_back_when_llm_unavailable():
+    idea_id = "test_llm_fallback_idea"
+    idea = Idea(id=idea_id, text="A recipe app", answers={"What are the core features?": "Meal planning uses a grocery list."})
+    save_idea(idea, IDEAS_DIR)
+
+    request = httpx.Request("POST", "https://example.invalid")
+    error = httpx.HTTPStatusError("rate limited", request=request, response=httpx.Response(429, request=request))
+    with patch('app.services.llm_client.LLMClient.send_prompt', side_effect=error):
+        graph = await build_graph_with_llm(idea_id)
+
+    labels = {node.label for node in graph.nodes}
+    assert {"recipe app", "Meal planning", "grocery list"} <= labels
+    # The draft is saved, but marked so it isn't served as the final graph
+    assert await load_graph(idea_id) == graph
+    assert await load_graph(idea_id, include_draft=False) is None
+
+    # The next build retries the LLM instead of returning the pinned draft
+    llm_graph = json.dumps({"nodes": [{"id": "1", "label": "Recipe app", "type": "idea"}], "edges": []})
+    with patch('app.services.llm_client.LLMClient.send_prompt', return_value=llm_graph) as mock_send_prompt:
+        graph = await build_graph_with_llm(idea_id)
+    mock_send_prompt.assert_called_once()
+    assert [node.label for node in graph.nodes] == ["Recipe app"]
+    assert await load_graph(idea_id, include_draft=False) == graph
+
+@pytest.mark.asyncio
+async def test_build_graph_with_llm_sends_draft():
+    idea_id = "test_llm_draft_idea"
+    idea = Idea(id=idea_id, text="A recipe app", answers={})
+    save_idea(idea, IDEAS_DIR)
+
+    llm_graph = json.dumps({"nodes": [{"id": "1", "label": "Recipe app", "type": "idea"}], "edges": []})
+    with patch('app.services.llm_client.LLMClient.send_prompt', return_value=llm_graph) as mock_send_prompt:
+        graph = await build_graph_with_llm(idea_id)
+
+    prompt = mock_send_prompt.call_args[0][0]
+    assert "{{draft_graph}}" not in prompt
+    assert "recipe app" in prompt
+    assert [node.label for node in graph.nodes] == ["Recipe app"]
+
+@pytest.mark.asyncio
+async def test_graph_versions_and_rollback():
+    idea_id = "test_graph_versions_idea"
+    idea = Idea(id=idea_id, text="A recipe app", answers={})
+    save_idea(idea, IDEAS_DIR)
+    original = await build_graph(idea_id)
+
+    edited = json.dumps({"nodes": [{"id": idea_id, "label": "Recipe app v2", "type": "idea"}], "edges": []})
+    with patch('app.services.llm_client.LLMClient.send_prompt', return_value=edited):
+        await edit_graph_with_llm(idea_id, "Rename the idea")
+
+    versions = list_graph_versions(idea_id)
+    assert [(v["version"], v["source"]) for v in versions] == [(1, "extraction"), (2, "edit")]
+    diff = diff_graph_versions(idea_id, 1, 2)
+    assert [n["label"] for n in diff["nodes_changed"]] == ["Recipe app v2"]
+
+    with patch('app.services.llm_client.LLMClient.send_prompt') as mock_send_prompt:
+        restored = await rollback_graph(idea_id, 1)
+        mock_send_prompt.assert_not_called()
+    assert restored == original
+    assert await load_graph(idea_id) == original
+    assert list_graph_versions(idea_id)[-1]["source"] == "rollback:1"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await rollback_graph(idea_id, 99)
+    assert exc_info.value.status_code == 404
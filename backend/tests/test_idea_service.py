@@ -1,8 +1,11 @@
 import pytest
 import os
+import json
 from unittest.mock import patch, MagicMock
-from app.services.idea_service import ingest_idea, generate_questions, submit_answers
-from app.models import Idea
+from app.services.idea_service import (
+    ingest_idea, generate_questions, submit_answers, submit_answers_stream, update_answer, delete_answer
+)
+from app.models import Idea, Question, question_id
 from app.config import IDEAS_DIR
 from fastapi import HTTPException
 
@@ -13,7 +16,7 @@ def setup_teardown():
     yield
     # Clean up any created idea files after tests
     for f in os.listdir(IDEAS_DIR):
-        if f.endswith(".json"):
+        if f.endswith((".json", ".jsonl")):
             os.remove(os.path.join(IDEAS_DIR, f))
 
 @pytest.mark.asyncio
@@ -45,7 +48,8 @@ async def test_generate_questions():
     mock_llm_response = "Q1: What is it?\nQ2: Why is it important?"
     with patch('app.services.llm_client.LLMClient.send_prompt', return_value=mock_llm_response) as mock_send_prompt:
         questions = await generate_questions(idea_id)
-        assert questions == ["Q1: What is it?", "Q2: Why is it important?"]
+        assert [q.question for q in questions] == ["Q1: What is it?", "Q2: Why is it important?"]
+        assert [q.id for q in questions] == [question_id("Q1: What is it?"), question_id("Q2: Why is it important?")]
         mock_send_prompt.assert_called_once()
         
         # Verify questions are saved to the idea
@@ -72,9 +76,10 @@ async def test_submit_answers():
     answers = {"Q1: Question one?": "Answer one.", "Q2: Question two?": "Answer two."}
     await submit_answers(idea_id, answers)
 
-    # Verify answers are saved
+    # Verify answers are saved, keyed by question id
     loaded_idea = Idea.model_validate_json(open(os.path.join(IDEAS_DIR, f"{idea_id}.json")).read())
-    assert loaded_idea.answers == answers
+    assert loaded_idea.answers == {question_id(q): a for q, a in answers.items()}
+    assert list(loaded_idea.iter_qa_pairs()) == list(answers.items())
 
 @pytest.mark.asyncio
 async def test_submit_answers_idea_not_found():
@@ -102,3 +107,114 @@ async def test_submit_answers_unknown_question():
 
     with pytest.raises(ValueError, match="Answer provided for unknown question: Unknown Q"):
         await submit_answers(idea_id, {"Unknown Q": "Answer."})
+
+async def _idea_with_questions(*questions):
+    idea_id = await ingest_idea("Idea with questions.")
+    with patch('app.services.llm_client.LLMClient.send_prompt', return_value="\n".join(questions)):
+        return idea_id, await generate_questions(idea_id)
+
+def _load(idea_id):
+    return Idea.model_validate_json(open(os.path.join(IDEAS_DIR, f"{idea_id}.json")).read())
+
+@pytest.mark.asyncio
+async def test_submit_answers_by_id_is_partial():
+    idea_id, questions = await _idea_with_questions("Q1: One?", "Q2: Two?", "Q3: Three?")
+    await submit_answers(idea_id, {questions[0].id: "First."})
+    await submit_answers(idea_id, {questions[2].id: "Third.", "Q2: Two?": "Second."})
+
+    loaded_idea = _load(idea_id)
+    assert loaded_idea.answers == {questions[0].id: "First.", questions[1].id: "Second.", questions[2].id: "Third."}
+    assert loaded_idea.render_qa_pairs() == "Q1: One?: First.\nQ2: Two?: Second.\nQ3: Three?: Third."
+
+@pytest.mark.asyncio
+async def test_regenerating_questions_keeps_earlier_answers():
+    idea_id, questions = await _idea_with_questions("Q1: One?", "Q2: Two?", "Q3: Three?")
+    await submit_answers(idea_id, {questions[0].id: "First.", questions[1].id: "Second."})
+
+    # The new wording drops Q2 and the unanswered Q3
+    with patch('app.services.llm_client.LLMClient.send_prompt', return_value="Q1: One?\nQ4: Four?"):
+        regenerated = await generate_questions(idea_id)
+    assert [q.question for q in regenerated] == ["Q1: One?", "Q4: Four?", "Q2: Two?"]
+
+    loaded_idea = _load(idea_id)
+    assert loaded_idea.answers == {questions[0].id: "First.", questions[1].id: "Second."}
+    assert loaded_idea.render_qa_pairs() == "Q1: One?: First.\nQ2: Two?: Second."
+
+@pytest.mark.asyncio
+async def test_update_and_delete_answer():
+    idea_id, questions = await _idea_with_questions("Q1: One?", "Q2: Two?")
+    await submit_answers(idea_id, {questions[0].id: "First.", questions[1].id: "Second."})
+
+    await update_answer(idea_id, questions[0].id, "First, revised.")
+    await delete_answer(idea_id, questions[1].id)
+    assert _load(idea_id).answers == {questions[0].id: "First, revised."}
+
+    with pytest.raises(HTTPException) as exc_info:
+        await update_answer(idea_id, "unknown", "Answer.")
+    assert exc_info.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_submit_answers_stream():
+    idea_id, questions = await _idea_with_questions(*[f"Q{i}: Question {i}?" for i in range(120)])
+
+    async def chunks():
+        body = "\n".join(json.dumps({"question_id": q.id, "answer": f"A{i}"}) for i, q in enumerate(questions))
+        body += "\n" + json.dumps({"question": "Q0: Question 0?", "answer": "A0 revised"}) + "\n"
+        encoded = body.encode()
+        # Arbitrary chunk boundaries, as they'd arrive over the network
+        for start in range(0, len(encoded), 37):
+            yield encoded[start:start + 37]
+
+    assert await submit_answers_stream(idea_id, chunks()) == 121
+    loaded_idea = _load(idea_id)
+    assert len(loaded_idea.answers) == 120
+    assert loaded_idea.answers[questions[0].id] == "A0 revised"
+    assert loaded_idea.answers[questions[119].id] == "A119"
+
+@pytest.mark.asyncio
+async def test_submit_answers_stream_unknown_question():
+    idea_id, _ = await _idea_with_questions("Q1: One?")
+
+    async def chunks():
+        yield b'{"question": "Unknown Q", "answer": "Answer."}\n'
+
+    with pytest.raises(HTTPException) as exc_info:
+        await submit_answers_stream(idea_id, chunks())
+    assert exc_info.value.status_code == 400
+    assert "line 1: Answer provided for unknown question: Unknown Q" in exc_info.value.detail
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bad_line, reason", [
+    (b'{"question_id": ', "invalid JSON"),
+    (b'[1, 2]', "expected a JSON object"),
+    (b'{"answer": "No question"}', 'each line needs "question_id"'),
+])
+async def test_submit_answers_stream_bad_line(bad_line, reason):
+    idea_id, questions = await _idea_with_questions(*[f"Q{i}: Question {i}?" for i in range(60)])
+
+    async def chunks():
+        for q in questions:
+            yield (json.dumps({"question_id": q.id, "answer": "Yes"}) + "\n").encode()
+        yield b"\n" + bad_line + b"\n"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await submit_answers_stream(idea_id, chunks())
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail.startswith(f"line 62: {reason}")  # The blank line still counts
+    assert "50 answers from earlier lines were already saved" in exc_info.value.detail
+    assert len(_load(idea_id).answers) == 50
+
+def test_legacy_idea_is_migrated():
+    legacy = {
+        "id": "legacy",
+        "text": "Old idea",
+        "questions": ["What is it?", "Who is it for?"],
+        "answers": {"What is it?": "A thing.", "Unlisted question?": "Kept."},
+    }
+    idea = Idea(**legacy)
+    assert [q.question for q in idea.questions] == ["What is it?", "Who is it for?", "Unlisted question?"]
+    assert idea.answers == {question_id("What is it?"): "A thing.", question_id("Unlisted question?"): "Kept."}
+    assert idea.resolve_question_id("Who is it for?") == question_id("Who is it for?")
+    assert idea.get_question(question_id("What is it?")) == Question(question="What is it?")
+    # Round-trips through the new layout unchanged
+    assert Idea(**idea.model_dump()) == idea
@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.config import Settings
+from app.services.llm_client import LLMClient
+from app.services.llm_cassettes import CassetteMiss, CassetteStore, prompt_hash
+
+
+def _settings(tmp_path, mode, scale=1.0):
+    return Settings(gemini_api_key="test-key", llm_mode=mode, llm_cassette_dir=str(tmp_path / "cassettes"), llm_replay_latency_scale=scale)
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path):
+    prompt = "Generate questions for: A recipe app"
+    with patch('app.services.llm_client.get_settings', return_value=_settings(tmp_path, "record")), \
+         patch('app.services.llm_client.asyncio.sleep', new_callable=AsyncMock), \
+         patch.object(LLMClient, '_send_live', new_callable=AsyncMock, return_value="Q1\nQ2") as mock_live:
+        assert await LLMClient().send_prompt(prompt) == "Q1\nQ2"
+    mock_live.assert_awaited_once_with(prompt)
+
+    path = tmp_path / "cassettes" / f"{prompt_hash(prompt)}.json.gz"
+    with gzip.open(path, "rt") as f:
+        entry = json.load(f)
+    assert entry["response"] == "Q1\nQ2"
+    assert entry["prompt_chars"] == len(prompt)
+    assert "prompt" not in entry
+
+    # Replay needs no network and sleeps the recorded latency times the scale
+    entry["latency"] = 2.0
+    with gzip.open(path, "wt") as f:
+        json.dump(entry, f)
+    with patch('app.services.llm_client.get_settings', return_value=_settings(tmp_path, "replay", scale=0.5)), \
+         patch('app.services.llm_client.get_cassette_store', return_value=CassetteStore(str(tmp_path / "cassettes"))), \
+         patch('app.services.llm_client.asyncio.sleep', new_callable=AsyncMock) as mock_sleep, \
+         patch.object(LLMClient, '_send_live', new_callable=AsyncMock) as mock_live:
+        assert await LLMClient().send_prompt(prompt) == "Q1\nQ2"
+    mock_live.assert_not_awaited()
+    mock_sleep.assert_awaited_once_with(1.0)
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises(tmp_path):
+    with patch('app.services.llm_client.get_settings', return_value=_settings(tmp_path, "replay")), \
+         patch.object(LLMClient, '_send_live', new_callable=AsyncMock) as mock_live:
+        with pytest.raises(CassetteMiss):
+            await LLMClient().send_prompt("Never recorded")
+    mock_live.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_live_mode_does_not_record(tmp_path):
+    with patch('app.services.llm_client.get_settings', return_value=_settings(tmp_path, "live")), \
+         patch('app.services.llm_client.asyncio.sleep', new_callable=AsyncMock), \
+         patch.object(LLMClient, '_send_live', new_callable=AsyncMock, return_value="ok"):
+        assert await LLMClient().send_prompt("Hello") == "ok"
+    assert not os.path.exists(tmp_path / "cassettes")
+
+
+def test_prompt_hash_masks_ids():
+    # Prompts for different ideas differ only in their random ids, so they share a recording
+    first = 'Draft: {"id": "0b8f5a52-4b55-4c4d-9b1a-2f1f0c6f6a11", "label": "Recipe app"}'
+    second = 'Draft: {"id": "7d2c9e10-1a3b-4f5e-8c7d-9e0f1a2b3c4d", "label": "Recipe app"}'
+    assert prompt_hash(first) == prompt_hash(second)
+    assert prompt_hash(first) != prompt_hash(first.replace("Recipe", "Fitness"))
+
+
+@pytest.mark.asyncio
+async def test_replay_maps_recorded_ids_to_current_prompt(tmp_path):
+    recorded_idea, recorded_node = "0b8f5a52-4b55-4c4d-9b1a-2f1f0c6f6a11", "1c2d3e4f-0000-4000-8000-000000000001"
+    current_idea, current_node = "7d2c9e10-1a3b-4f5e-8c7d-9e0f1a2b3c4d", "9f8e7d6c-0000-4000-8000-000000000002"
+    invented = "aaaaaaaa-bbbb-4ccc-8ddd-eeeeeeeeeeee"
+    template = 'Draft: [{{"id": "{idea}"}}, {{"id": "{node}"}}] for idea {idea}'
+    recorded_response = json.dumps({"edges": [{"from_node": recorded_idea, "to_node": recorded_node}, {"from_node": recorded_idea, "to_node": invented}]})
+    store = CassetteStore(str(tmp_path / "cassettes"))
+    store.save(template.format(idea=recorded_idea, node=recorded_node), recorded_response, latency=0)
+
+    with patch('app.services.llm_client.get_settings', return_value=_settings(tmp_path, "replay", scale=0)), \
+         patch('app.services.llm_client.get_cassette_store', return_value=store):
+        replayed = json.loads(await LLMClient().send_prompt(template.format(idea=current_idea, node=current_node)))
+    assert replayed["edges"] == [
+        {"from_node": current_idea, "to_node": current_node},
+        {"from_node": current_idea, "to_node": invented},
+    ]
+
+
+def test_store_serves_from_memory_after_first_read(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    store.save("prompt", "response", latency=0.5)
+    reader = CassetteStore(str(tmp_path))
+    assert reader.load("prompt")["response"] == "response"
+    os.remove(tmp_path / f"{prompt_hash('prompt')}.json.gz")
+    assert reader.load("prompt")["latency"] == 0.5
+    assert reader.load("other prompt") is None
+
+
+def test_concurrent_saves_use_separate_temp_files(tmp_path):
+    store = CassetteStore(str(tmp_path))
+    real_replace = os.replace
+    temp_paths = []
+
+    def save_again(src, dst):
+        # A second recorder of the same prompt writes while the first is about to move its file
+        temp_paths.append(src)
+        if len(temp_paths) == 1:
+            store.save("prompt", "second", latency=0)
+        real_replace(src, dst)
+
+    with patch('app.services.llm_cassettes.os.replace', side_effect=save_again):
+        store.save("prompt", "first", latency=0)
+    assert len(set(temp_paths)) == 2
+    with gzip.open(tmp_path / f"{prompt_hash('prompt')}.json.gz", "rt") as f:
+        assert json.load(f)["response"] == "first"  # Both files were complete; the last one moved in wins
+    assert os.listdir(tmp_path) == [f"{prompt_hash('prompt')}.json.gz"]
@@ -5,7 +5,7 @@ from app.services.idea_service import ingest_idea, generate_questions, submit_an
 from app.services.graph_service import build_graph_with_llm, edit_graph_with_llm
 from app.services.plan_service import get_plan
 from unittest.mock import patch, MagicMock
-from app.models import GraphEditRequest
+from app.models import GraphEditRequest, Graph, Node
 
 client = TestClient(app)
 
@@ -53,7 +53,7 @@ async def test_get_graph(mock_services):
     response = client.get("/ideas/test_idea_id/graph")
     assert response.status_code == 200
     assert response.json() == {"nodes": [], "edges": []}
-    mock_build_graph_with_llm.assert_called_once_with("test_idea_id")
+    mock_build_graph_with_llm.assert_called_once_with("test_idea_id", regenerate=False)
 
 @pytest.mark.asyncio
 async def test_edit_graph(mock_services):
@@ -74,4 +74,91 @@ async def test_get_plan(mock_services):
     response = client.get("/ideas/test_idea_id/plan")
     assert response.status_code == 200
     assert response.json() == {"plan": "# Test Plan"}
-    mock_get_plan.assert_called_once_with("test_idea_id")
+    mock_get_plan.assert_called_once_with("test_idea_id", regenerate=False)
+
+@pytest.mark.asyncio
+async def test_get_graph_serves_saved_graph(mock_services):
+    _, _, _, mock_build_graph_with_llm, _, _ = mock_services
+    saved_graph = Graph(nodes=[Node(id="1", label="Saved")], edges=[])
+    with patch('app.main.load_graph', return_value=saved_graph) as mock_load_graph:
+        response = client.get("/ideas/test_idea_id/graph")
+    assert response.status_code == 200
+    assert response.json()["nodes"][0]["label"] == "Saved"
+    assert response.headers["etag"]
+    mock_load_graph.assert_called_once_with("test_idea_id", include_draft=False)
+    mock_build_graph_with_llm.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_graph_regenerate(mock_services):
+    _, _, _, mock_build_graph_with_llm, _, _ = mock_services
+    mock_build_graph_with_llm.return_value = {"nodes": [], "edges": []}
+    with patch('app.main.load_graph') as mock_load_graph:
+        response = client.get("/ideas/test_idea_id/graph", params={"regenerate": "true"})
+    assert response.status_code == 200
+    mock_load_graph.assert_not_called()
+    mock_build_graph_with_llm.assert_called_once_with("test_idea_id", regenerate=True)
+
+@pytest.mark.asyncio
+async def test_get_plan_conditional_get(mock_services):
+    _, _, _, _, _, mock_get_plan = mock_services
+    mock_plan_obj = MagicMock()
+    mock_plan_obj.markdown = "# Test Plan"
+    mock_get_plan.return_value = mock_plan_obj
+    first = client.get("/ideas/test_idea_id/plan")
+    etag = first.headers["etag"]
+
+    second = client.get("/ideas/test_idea_id/plan", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+    mock_plan_obj.markdown = "# Changed Plan"
+    third = client.get("/ideas/test_idea_id/plan", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_get_plan_gzip(mock_services):
+    _, _, _, _, _, mock_get_plan = mock_services
+    mock_plan_obj = MagicMock()
+    mock_plan_obj.markdown = "# Big Plan\n" + "- task\n" * 500
+    mock_get_plan.return_value = mock_plan_obj
+    response = client.get("/ideas/test_idea_id/plan", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.json() == {"plan": mock_plan_obj.markdown} # httpx decodes transparently
+
+    # The encoded ETag still validates the same content
+    revalidated = client.get("/ideas/test_idea_id/plan", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == response.headers["etag"]
+
+@pytest.mark.asyncio
+async def test_graph_versions_endpoints(mock_services):
+    with patch('app.main.list_graph_versions', return_value=[{"version": 1}]) as mock_list, \
+         patch('app.main.diff_graph_versions', return_value={"nodes_added": []}) as mock_diff, \
+         patch('app.main.rollback_graph', return_value={"nodes": [], "edges": []}) as mock_rollback:
+        assert client.get("/ideas/test_idea_id/graph/versions").json() == {"versions": [{"version": 1}]}
+        response = client.get("/ideas/test_idea_id/graph/versions/diff", params={"from_version": 1, "to_version": 2})
+        assert response.json() == {"nodes_added": []}
+        response = client.post("/ideas/test_idea_id/graph/versions/1/rollback")
+        assert response.status_code == 200
+    mock_list.assert_called_once_with("test_idea_id")
+    mock_diff.assert_called_once_with("test_idea_id", 1, 2)
+    mock_rollback.assert_called_once_with("test_idea_id", 1)
+
+@pytest.mark.asyncio
+async def test_answer_level_endpoints(mock_services):
+    with patch('app.main.update_answer') as mock_update_answer, \
+         patch('app.main.delete_answer') as mock_delete_answer, \
+         patch('app.main.submit_answers_stream', return_value=2) as mock_submit_answers_stream:
+        response = client.put("/ideas/test_idea_id/answers/q1", json={"answer": "A1"})
+        assert response.json() == {"status": "saved"}
+        response = client.delete("/ideas/test_idea_id/answers/q1")
+        assert response.json() == {"status": "deleted"}
+        response = client.post("/ideas/test_idea_id/answers/stream", content=b'{"question_id": "q1", "answer": "A1"}\n')
+        assert response.json() == {"status": "saved", "count": 2}
+    mock_update_answer.assert_called_once_with("test_idea_id", "q1", "A1")
+    mock_delete_answer.assert_called_once_with("test_idea_id", "q1")
+    assert mock_submit_answers_stream.call_args[0][0] == "test_idea_id"
@@ -2,7 +2,7 @@ import pytest
 import os
 import json
 from unittest.mock import patch, MagicMock
-from app.services.plan_service import generate_plan, get_plan
+from app.services.plan_service import generate_plan, get_plan, list_plan_versions, diff_plan_versions, rollback_plan
 from app.models import Plan, Graph, Node, Edge, Idea
 from app.storage import save_plan_markdown, load_plan_markdown, save_idea
 from app.config import PLANS_DIR, IDEAS_DIR
@@ -15,7 +15,7 @@ def setup_teardown():
     yield
     for d in [PLANS_DIR, IDEAS_DIR]:
         for f in os.listdir(d):
-            if f.endswith(".json") or f.endswith(".md"):
+            if f.endswith((".json", ".jsonl", ".md")):
                 os.remove(os.path.join(d, f))
 
 @pytest.mark.asyncio
@@ -88,3 +88,35 @@ async def test_get_plan_idea_not_found_for_graph_build():
         assert exc_info.value.status_code == 404
         assert exc_info.value.detail == "Idea not found."
         mock_build_graph_with_llm.assert_called_once_with("non_existent_idea_for_plan")
+
+@pytest.mark.asyncio
+async def test_get_plan_regenerate_ignores_existing():
+    idea_id = "test_regenerate_plan"
+    save_plan_markdown(Plan(idea_id=idea_id, markdown="# Old Plan"), PLANS_DIR)
+    mock_graph = Graph(nodes=[Node(id=idea_id, label="Idea", type="idea")], edges=[])
+
+    with patch('app.services.plan_service.load_graph', return_value=mock_graph), \
+         patch('app.services.plan_service.generate_plan', return_value="# New Plan") as mock_generate_plan:
+        plan = await get_plan(idea_id, regenerate=True)
+        assert plan.markdown == "# New Plan"
+        mock_generate_plan.assert_called_once_with(mock_graph)
+
+    assert load_plan_markdown(idea_id, PLANS_DIR) == "# New Plan"
+
+@pytest.mark.asyncio
+async def test_plan_versions_and_rollback():
+    idea_id = "test_plan_versions"
+    mock_graph = Graph(nodes=[Node(id=idea_id, label="Idea", type="idea")], edges=[])
+
+    with patch('app.services.plan_service.load_graph', return_value=mock_graph), \
+         patch('app.services.plan_service.generate_plan', side_effect=["# Plan\n\n1. Design\n", "# Plan\n\n1. Design\n2. Build\n"]):
+        await get_plan(idea_id)
+        await get_plan(idea_id, regenerate=True)
+
+    assert [v["version"] for v in list_plan_versions(idea_id)] == [1, 2]
+    assert "+2. Build" in diff_plan_versions(idea_id, 1, 2)
+
+    plan = await rollback_plan(idea_id, 1)
+    assert plan.markdown == "# Plan\n\n1. Design\n"
+    assert load_plan_markdown(idea_id, PLANS_DIR) == plan.markdown
+    assert len(list_plan_versions(idea_id)) == 3
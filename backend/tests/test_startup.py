@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.main import app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for the app's own modules (self time, excluding fastapi/pydantic).
+# Typically ~40 ms; the budget leaves room for slow CI machines.
+APP_IMPORT_BUDGET_MS = 250
+# Dependencies that must only be imported on first use, never by `import app.main`.
+LAZY_MODULES = ("httpx", "dotenv", "redis")
+
+client = TestClient(app)
+
+
+def _import_profile():
+    """Runs `python -X importtime -c 'import app.main'` in a fresh interpreter and parses the result."""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(self_us)
+    return profile
+
+
+def test_import_app_main_defers_heavy_dependencies():
+    profile = _import_profile()
+    assert "app.main" in profile
+    eager = [name for name in profile if name.split(".")[0] in LAZY_MODULES]
+    assert eager == [], f"Imported at startup: {eager}"
+
+
+def test_import_app_main_within_budget():
+    profile = _import_profile()
+    app_ms = sum(us for name, us in profile.items() if name == "app" or name.startswith("app.")) / 1000
+    assert app_ms < APP_IMPORT_BUDGET_MS, f"app.* modules took {app_ms:.1f} ms to import"
+
+
+def test_health_live():
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_health_ready():
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["checks"]["ideas_dir"]["ok"] is True
+    assert body["checks"]["coordination"]["ok"] is True
+    # The LLM key is reported but never blocks readiness
+    assert body["checks"]["llm"]["critical"] is False
+
+
+def test_health_ready_reports_unwritable_storage():
+    with patch('app.health._check_directory', return_value={"ok": False, "path": "data/ideas", "error": "denied"}):
+        response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
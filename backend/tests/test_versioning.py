@@ -0,0 +1,101 @@
+import json
+import os
+from app.versioning import (
+    VersionStore, graph_delta, apply_graph_delta, graph_diff, text_delta, apply_text_delta, text_diff
+)
+
+def _node(node_id, label, priority=0):
+    return {"id": node_id, "label": label, "type": "feature", "priority": priority, "notes": ""}
+
+def _edge(from_node, to_node, relation="depends on"):
+    return {"from_node": from_node, "to_node": to_node, "relation": relation}
+
+def _graph_store(tmp_path, **kwargs):
+    return VersionStore("graph", str(tmp_path), graph_delta, apply_graph_delta, **kwargs)
+
+def test_graph_delta_roundtrip():
+    old = {"nodes": [_node("1", "Idea"), _node("2", "Login"), _node("3", "Chat")], "edges": [_edge("1", "2"), _edge("1", "3")]}
+    new = {"nodes": [_node("1", "Idea"), _node("2", "Login", priority=3), _node("4", "Search")], "edges": [_edge("1", "2"), _edge("1", "4", "has feature")]}
+    delta = graph_delta(old, new)
+    assert delta["nodes_added"] == [_node("4", "Search")]
+    assert delta["nodes_removed"] == ["3"]
+    assert delta["nodes_changed"] == [_node("2", "Login", priority=3)]
+    assert delta["edges_removed"] == [_edge("1", "3")]
+    assert delta["edges_added"] == [_edge("1", "4", "has feature")]
+    assert apply_graph_delta(old, delta) == new
+
+def test_graph_diff_has_all_sections():
+    graph = {"nodes": [_node("1", "Idea")], "edges": []}
+    assert graph_diff(graph, graph) == {
+        "nodes_added": [], "nodes_removed": [], "nodes_changed": [], "edges_added": [], "edges_removed": []
+    }
+
+def test_text_delta_roundtrip():
+    old = "# Plan\n\n1. Design\n2. Build\n3. Ship\n"
+    new = "# Plan\n\n1. Research\n2. Design\n3. Build\n4. Ship\n"
+    assert apply_text_delta(old, text_delta(old, new)) == new
+    assert apply_text_delta(new, text_delta(new, old)) == old
+    assert "+1. Research" in text_diff(old, new)
+
+def test_store_records_deltas_and_reconstructs_every_version(tmp_path):
+    store = _graph_store(tmp_path, snapshot_interval=3)
+    graphs = []
+    nodes = [_node("0", "Idea")]
+    for i in range(1, 8):
+        nodes = nodes + [_node(str(i), f"Feature {i}")]
+        graph = {"nodes": list(nodes), "edges": [_edge("0", str(i))]}
+        graphs.append(graph)
+        assert store.record("idea", graph, source="test") == i
+
+    kinds = [v["kind"] for v in store.list_versions("idea")]
+    assert kinds == ["snapshot", "delta", "delta", "snapshot", "delta", "delta", "snapshot"]
+    for version, graph in enumerate(graphs, start=1):
+        assert store.get("idea", version) == graph
+    assert store.get("idea", 0) is None
+    assert store.get("idea", 8) is None
+
+def test_store_skips_unchanged_content(tmp_path):
+    store = _graph_store(tmp_path)
+    graph = {"nodes": [_node("1", "Idea")], "edges": []}
+    assert store.record("idea", graph) == 1
+    assert store.record("idea", json.loads(json.dumps(graph))) == 1
+    assert store.latest_version("idea") == 1
+
+def test_store_falls_back_to_snapshot_for_reorders(tmp_path):
+    store = _graph_store(tmp_path)
+    nodes = [_node(str(i), f"Feature {i}") for i in range(5)]
+    store.record("idea", {"nodes": nodes, "edges": []})
+    reordered = {"nodes": list(reversed(nodes)), "edges": []}
+    store.record("idea", reordered)
+    assert store.list_versions("idea")[1]["kind"] == "snapshot"
+    assert store.get("idea", 2) == reordered
+
+def test_store_file_layout(tmp_path):
+    store = VersionStore("plan", str(tmp_path), text_delta, apply_text_delta)
+    store.record("idea", "# Plan\n")
+    assert os.path.exists(os.path.join(str(tmp_path), "idea_plan_versions.jsonl"))
+    assert store.list_versions("missing") == []
+
+def test_store_survives_torn_last_line(tmp_path):
+    store = VersionStore("plan", str(tmp_path), text_delta, apply_text_delta)
+    store.record("idea", "# Plan\n")
+    store.record("idea", "# Plan\n- task\n")
+    path = os.path.join(str(tmp_path), "idea_plan_versions.jsonl")
+    with open(path, "a") as f:
+        f.write('{"version": 3, "kind": "snap')  # Crash mid-append
+    assert store.latest_version("idea") == 2
+    assert store.get("idea", 2) == "# Plan\n- task\n"
+
+    assert store.record("idea", "# Plan v3\n") == 3
+    assert store.get("idea", 3) == "# Plan v3\n"
+    with open(path) as f:
+        assert [json.loads(line)["version"] for line in f] == [1, 2, 3]
+
+def test_store_migrates_legacy_history_file(tmp_path):
+    legacy = {"versions": [{"version": 1, "created_at": "", "source": "llm", "kind": "snapshot", "data": "# Old\n"}]}
+    with open(os.path.join(str(tmp_path), "idea_plan_versions.json"), "w") as f:
+        json.dump(legacy, f)
+    store = VersionStore("plan", str(tmp_path), text_delta, apply_text_delta)
+    assert store.get("idea", 1) == "# Old\n"
+    assert store.record("idea", "# New\n") == 2
+    assert not os.path.exists(os.path.join(str(tmp_path), "idea_plan_versions.json"))